@@ -0,0 +1,297 @@
+import io
+import json
+import os
+import subprocess
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import soundfile as sf
+
+# Her okumada ffmpeg'den alınacak örnek (frame) sayısı
+CHUNK_FRAMES = 1 << 16
+
+# Sınır iyileştirmede kullanılan enerji zarfının çerçeve uzunluğu
+ENVELOPE_FRAME_MS = 10
+
+# Desteklenen çıktı uzantıları -> (libsndfile biçimi, alt tür)
+OUTPUT_FORMATS = {
+    "mp3": ("MP3", None),
+    "flac": ("FLAC", "PCM_16"),
+    "wav": ("WAV", "PCM_16"),
+    "opus": ("OGG", "OPUS"),
+}
+
+# libsndfile'ın yalnızca belirli örnekleme hızlarında yazabildiği alt türler;
+# diğer hızlarda ffmpeg'e (uygun hıza kendisi dönüştürür) düşülür
+SUBTYPE_SAMPLE_RATES = {
+    "OPUS": (8000, 12000, 16000, 24000, 48000),
+}
+
+def probe_audio(audio_file):
+    """ffprobe ile ilk ses akışının örnekleme hızını ve kanal sayısını döndürür."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=sample_rate,channels",
+        "-of", "json",
+        audio_file,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    streams = json.loads(result.stdout).get("streams", [])
+    if not streams:
+        raise ValueError(f"Ses akışı bulunamadı: {audio_file}")
+    return int(streams[0]["sample_rate"]), int(streams[0]["channels"])
+
+def stream_pcm(audio_file, sample_rate, channels, chunk_frames=CHUNK_FRAMES):
+    """Ses dosyasını tek bir ffmpeg süreciyle çözer ve float32 PCM parçaları halinde akıtır.
+
+    Her parça (frame, kanal) boyutunda bir numpy dizisidir; dosyanın tamamı
+    hiçbir zaman belleğe alınmaz.
+    """
+    cmd = [
+        "ffmpeg", "-v", "error", "-nostdin",
+        "-i", audio_file,
+        "-vn", "-f", "f32le", "-acodec", "pcm_f32le",
+        "-ar", str(sample_rate), "-ac", str(channels),
+        "pipe:1",
+    ]
+    frame_bytes = 4 * channels
+    with tempfile.TemporaryFile() as error_log:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=error_log)
+        try:
+            pending = b""
+            while True:
+                data = proc.stdout.read(chunk_frames * frame_bytes)
+                if not data:
+                    break
+                data = pending + data
+                usable = len(data) - len(data) % frame_bytes
+                pending = data[usable:]
+                if usable:
+                    yield np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, channels)
+        except BaseException:
+            # Tüketici erken durdurursa (veya hata olursa) ffmpeg'i beklemeden kapat
+            proc.kill()
+            proc.wait()
+            raise
+        finally:
+            proc.stdout.close()
+
+        if proc.wait() != 0:
+            error_log.seek(0)
+            message = error_log.read().decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"ffmpeg çözümleme hatası ({audio_file}): {message}")
+
+class EnergyEnvelope:
+    """Akan PCM'den çerçeve başına enerji (dBFS) zarfını artımlı olarak hesaplar.
+
+    Her örnek yalnızca bir kez işlenir; zarf, bölücünün tuttuğu tampon ile
+    birlikte kısaltılır.
+    """
+
+    def __init__(self, hop):
+        self.hop = hop
+        self.start_frame = 0
+        self.db = np.empty(0, dtype=np.float32)
+        self._rest = np.empty(0, dtype=np.float32)
+
+    def feed(self, chunk):
+        mono = np.concatenate((self._rest, chunk.mean(axis=1)))
+        count = len(mono) // self.hop
+        frames = mono[:count * self.hop].reshape(count, self.hop)
+        self._rest = mono[count * self.hop:]
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        self.db = np.concatenate((self.db, (20 * np.log10(np.maximum(rms, 1e-10))).astype(np.float32)))
+
+    def drop_before(self, sample):
+        frame = sample // self.hop
+        if frame > self.start_frame:
+            self.db = self.db[frame - self.start_frame:]
+            self.start_frame = frame
+
+    def refine(self, starts, ends, search_ms=150, margin_ms=50, threshold_db=-40.0, sample_rate=16000):
+        """Aralık sınırlarını yakın düşük enerjili noktalara oturtur ve sessizliği kırpar.
+
+        Tüm işlemler aralık dizileri üzerinde toplu yapılır: her sınır
+        ±search_ms içindeki en düşük enerjili çerçeveye taşınır, ardından
+        threshold_db'yi aşan ilk/son çerçevenin margin_ms ötesindeki sessizlik
+        atılır. Hiç sesli çerçeve içermeyen aralıklar yalnızca oturtulur.
+        Örnek cinsinden (starts, ends) döndürür.
+        """
+        n = len(self.db)
+        if n == 0 or len(starts) == 0:
+            return starts, ends
+
+        hop = self.hop
+        frame_starts = starts // hop - self.start_frame
+        frame_ends = -(-ends // hop) - self.start_frame
+
+        window = max(1, search_ms * sample_rate // 1000 // hop)
+        offsets = np.arange(-window, window + 1)
+        rows = np.arange(len(starts))
+
+        def snap(frames):
+            candidates = np.clip(frames[:, None] + offsets, 0, n - 1)
+            return candidates[rows, np.argmin(self.db[candidates], axis=1)]
+
+        frame_starts = snap(frame_starts)
+        frame_ends = np.maximum(snap(frame_ends), frame_starts + 1)
+
+        # Her çerçeve için sonraki/önceki sesli çerçevenin indeksi
+        loud = self.db > threshold_db
+        index = np.arange(n)
+        next_loud = np.minimum.accumulate(np.where(loud, index, n)[::-1])[::-1]
+        prev_loud = np.maximum.accumulate(np.where(loud, index, -1))
+
+        first = next_loud[np.clip(frame_starts, 0, n - 1)]
+        last = prev_loud[np.clip(frame_ends - 1, 0, n - 1)]
+        has_sound = (first < frame_ends) & (last >= frame_starts)
+
+        margin = margin_ms * sample_rate // 1000 // hop
+        trimmed_starts = np.where(has_sound, np.maximum(frame_starts, first - margin), frame_starts)
+        trimmed_ends = np.where(has_sound, np.minimum(frame_ends, last + 1 + margin), frame_ends)
+
+        return (trimmed_starts + self.start_frame) * hop, (trimmed_ends + self.start_frame) * hop
+
+def speech_features(samples, sample_rate, n_fft=512, band=(300, 3400)):
+    """Segmentin ortalama spektral düzlüğünü ve konuşma bandı enerji oranını döndürür.
+
+    Tüm çerçeveler tek bir rfft çağrısıyla işlenir. Gürültü ve alkış yüksek
+    düzlük, geniş bantlı müzik ise düşük konuşma bandı oranı verir.
+    """
+    mono = samples.mean(axis=1) if samples.ndim > 1 else samples
+    if len(mono) < n_fft:
+        mono = np.pad(mono, (0, n_fft - len(mono)))
+    frames = np.lib.stride_tricks.sliding_window_view(mono, n_fft)[::n_fft // 2]
+    power = np.square(np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1))) + 1e-12
+
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    in_band = (freqs >= band[0]) & (freqs <= band[1])
+    band_ratio = power[:, in_band].sum() / power.sum()
+
+    # Sessiz çerçeveler düzlüğü yapay olarak yükseltir; enerjiye göre ağırlıkla
+    weights = power.sum(axis=1)
+    return float(np.average(flatness, weights=weights)), float(band_ratio)
+
+def iter_segments(audio_file, spans, sample_rate, channels, chunk_frames=CHUNK_FRAMES, refine=None):
+    """(index, start_ms, end_ms) aralıklarını kaynağı tek geçişte çözerek keser.
+
+    Bellekte yalnızca henüz tamamlanmamış en erken aralığın başından itibaren
+    okunan örnekler tutulur. Aralıklar bitiş zamanlarına ulaşıldıkça
+    (index, samples) olarak üretilir; dosya sonunu aşan aralıklar kırpılır.
+    refine verilirse (EnergyEnvelope.refine parametreleri) sınırlar akış
+    sırasında hesaplanan enerji zarfına göre iyileştirilir.
+    """
+    spans = sorted(
+        (
+            (index, max(0, start_ms * sample_rate // 1000), max(0, end_ms * sample_rate // 1000))
+            for index, start_ms, end_ms in spans
+        ),
+        key=lambda span: span[1],
+    )
+    spans = [span for span in spans if span[2] > span[1]]
+
+    # Sınır iyileştirme, aralığın her iki yanında arama penceresi kadar veri ister
+    envelope = None
+    pad = 0
+    if refine is not None:
+        envelope = EnergyEnvelope(max(1, sample_rate * ENVELOPE_FRAME_MS // 1000))
+        pad = refine.get("search_ms", 150) * sample_rate // 1000
+
+    buffer = np.empty((0, channels), dtype=np.float32)
+    buffer_start = 0
+    next_span = 0
+    active = []
+
+    def cut(ready):
+        starts = np.array([start for _, start, _ in ready], dtype=np.int64)
+        ends = np.array([end for _, _, end in ready], dtype=np.int64)
+        if envelope is not None:
+            starts, ends = envelope.refine(starts, ends, sample_rate=sample_rate, **refine)
+        for (index, _, _), start, end in zip(ready, starts.tolist(), ends.tolist()):
+            segment = buffer[max(0, start - buffer_start):max(0, end - buffer_start)]
+            if len(segment):
+                yield index, segment.copy()
+
+    for chunk in stream_pcm(audio_file, sample_rate, channels, chunk_frames):
+        buffer = np.concatenate((buffer, chunk)) if len(buffer) else chunk
+        position = buffer_start + len(buffer)
+        if envelope is not None:
+            envelope.feed(chunk)
+
+        # Başlangıcı okunan bölgeye giren aralıkları etkinleştir
+        while next_span < len(spans) and spans[next_span][1] - pad < position:
+            active.append(spans[next_span])
+            next_span += 1
+
+        ready = [span for span in active if span[2] + pad <= position]
+        if ready:
+            active = [span for span in active if span[2] + pad > position]
+            yield from cut(ready)
+
+        # Artık hiçbir aralığın ihtiyaç duymadığı örnekleri bırak
+        keep_from = position
+        if active:
+            keep_from = min(keep_from, min(start for _, start, _ in active) - pad)
+        if next_span < len(spans):
+            keep_from = min(keep_from, spans[next_span][1] - pad)
+        if keep_from > buffer_start:
+            buffer = buffer[keep_from - buffer_start:]
+            buffer_start = keep_from
+            if envelope is not None:
+                envelope.drop_before(keep_from)
+
+    # Dosya, aralık bitmeden sona erdiyse eldeki kısmı ver
+    remaining = active + spans[next_span:]
+    if remaining:
+        yield from cut(remaining)
+
+def _ffmpeg_encode(samples, sample_rate, output_path):
+    """libsndfile'ın yazamadığı biçimler için PCM'i ffmpeg'e borulayarak kodlar."""
+    channels = samples.shape[1] if samples.ndim > 1 else 1
+    cmd = [
+        "ffmpeg", "-v", "error", "-nostdin", "-y",
+        "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels),
+        "-i", "pipe:0",
+        output_path,
+    ]
+    subprocess.run(cmd, input=np.ascontiguousarray(samples, dtype=np.float32).tobytes(),
+                   capture_output=True, check=True)
+
+@lru_cache(maxsize=None)
+def _soundfile_format(extension, sample_rate):
+    """Uzantı ve örnekleme hızı için libsndfile (biçim, alt tür) çiftini; yazılamıyorsa None döndürür."""
+    fmt, subtype = OUTPUT_FORMATS.get(extension, (extension.upper(), None))
+    if fmt not in sf.available_formats():
+        return None
+    if subtype is not None and subtype not in sf.available_subtypes(fmt):
+        return None
+    if sample_rate not in SUBTYPE_SAMPLE_RATES.get(subtype, (sample_rate,)):
+        return None
+    return fmt, subtype
+
+def encode_segment(samples, sample_rate, extension):
+    """Segmenti verilen uzantının biçiminde kodlayıp bayt olarak döndürür (parça deposu için)."""
+    soundfile_format = _soundfile_format(extension, sample_rate)
+    if soundfile_format:
+        fmt, subtype = soundfile_format
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, sample_rate, format=fmt, subtype=subtype)
+        return buffer.getvalue()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = os.path.join(tmp_dir, f"segment.{extension}")
+        _ffmpeg_encode(samples, sample_rate, tmp_path)
+        with open(tmp_path, "rb") as f:
+            return f.read()
+
+def write_segment(samples, sample_rate, output_path):
+    """Segmenti uzantısına göre süreç içinde (libsndfile) ya da ffmpeg ile kodlar."""
+    soundfile_format = _soundfile_format(os.path.splitext(output_path)[1][1:].lower(), sample_rate)
+    if soundfile_format:
+        fmt, subtype = soundfile_format
+        sf.write(output_path, samples, sample_rate, format=fmt, subtype=subtype)
+    else:
+        _ffmpeg_encode(samples, sample_rate, output_path)
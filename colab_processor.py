@@ -12,8 +12,9 @@ def set_hf_token():
 def install_dependencies():
     packages = [
         'yt-dlp',
-        'pydub',
-        'webvtt-py',
+        'numpy',
+        'pyarrow>=16',
+        'soundfile',
         'datasets',
         'transformers',
         'librosa',
@@ -28,6 +29,7 @@ def create_directories():
     dirs = [
         '/content/output/audio',
         '/content/output/json',
+        '/content/output/dataset',
         '/content/output/spectrogram'
     ]
     for dir_path in dirs:
@@ -38,7 +40,15 @@ def download_scripts():
     scripts = {
         'youtube_splitter_tr.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/youtube_splitter_tr.py',
         'processed_dataset.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/processed_dataset.py',
-        'upload_to_huggingface.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/upload_to_huggingface.py'
+        'upload_to_huggingface.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/upload_to_huggingface.py',
+        'audio_segmenter.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/audio_segmenter.py',
+        'pipeline_ledger.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/pipeline_ledger.py',
+        'subtitle_cues.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/subtitle_cues.py',
+        'spectrogram_image.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/spectrogram_image.py',
+        'feature_engine.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/feature_engine.py',
+        'feature_cache.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/feature_cache.py',
+        'dataset_writer.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/dataset_writer.py',
+        'shard_store.py': 'https://raw.githubusercontent.com/zinderud/sayha/main/shard_store.py'
     }
     for filename, url in scripts.items():
         subprocess.run(['wget', '-O', filename, url])
@@ -49,8 +59,8 @@ def process_youtube_video(youtube_url):
         # YouTube videosunu işle
         subprocess.run(['python', 'youtube_splitter_tr.py', youtube_url], check=True)
         
-        # Veri setini işle
-        subprocess.run(['python', 'processed_dataset.py'], check=True)
+        # Veri setini işle (biten videolar arka planda yüklenir)
+        subprocess.run(['python', 'processed_dataset.py', '--upload'], check=True)
         
         # Repository adını al
         repo_name = "sadece/sayha" 
@@ -64,7 +74,7 @@ def process_youtube_video(youtube_url):
         print(f"Hata oluştu: {e}")
     finally:
         # Geçici dosyaları temizle
-        for folder in ['audio', 'json', 'spectrogram']:
+        for folder in ['audio', 'json', 'dataset', 'spectrogram']:
             path = f'/content/output/{folder}/'
             subprocess.run(['rm', '-rf', path + '*'])
 
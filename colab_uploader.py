@@ -7,7 +7,7 @@ import subprocess
 drive.mount('/content/drive')
 
 # Gerekli kütüphaneleri yükle
-!pip install yt-dlp pydub webvtt-py datasets transformers librosa huggingface_hub python-dotenv
+!pip install yt-dlp numpy 'pyarrow>=16' soundfile datasets transformers librosa huggingface_hub python-dotenv
 
 # Hugging Face token'ını ayarla
 import os
@@ -16,12 +16,21 @@ os.environ['HUGGINGFACE_TOKEN'] = 'your_token_here'  # Token'ınızı buraya yaz
 # Gerekli klasörleri oluştur
 !mkdir -p /content/output/audio
 !mkdir -p /content/output/json
+!mkdir -p /content/output/dataset
 !mkdir -p /content/output/spectrogram
 
 # GitHub'dan dosyaları indir
 !wget https://raw.githubusercontent.com/zinderud/sayha/main/youtube_splitter_tr.py
 !wget https://raw.githubusercontent.com/zinderud/sayha/main/processed_dataset.py
 !wget https://raw.githubusercontent.com/zinderud/sayha/main/upload_to_huggingface.py
+!wget https://raw.githubusercontent.com/zinderud/sayha/main/audio_segmenter.py
+!wget https://raw.githubusercontent.com/zinderud/sayha/main/pipeline_ledger.py
+!wget https://raw.githubusercontent.com/zinderud/sayha/main/subtitle_cues.py
+!wget https://raw.githubusercontent.com/zinderud/sayha/main/spectrogram_image.py
+!wget https://raw.githubusercontent.com/zinderud/sayha/main/feature_engine.py
+!wget https://raw.githubusercontent.com/zinderud/sayha/main/feature_cache.py
+!wget https://raw.githubusercontent.com/zinderud/sayha/main/dataset_writer.py
+!wget https://raw.githubusercontent.com/zinderud/sayha/main/shard_store.py
 
 def process_youtube_video(youtube_url):
     try:
@@ -42,6 +51,7 @@ def process_youtube_video(youtube_url):
         # Geçici dosyaları temizle
         !rm -rf /content/output/audio/*
         !rm -rf /content/output/json/*
+        !rm -rf /content/output/dataset/*
         !rm -rf /content/output/spectrogram/*
 
 # Kullanım örneği
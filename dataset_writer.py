@@ -0,0 +1,242 @@
+"""İşlenmiş segment kayıtlarını akış halinde Parquet dosyasına yazar.
+
+Kayıtlar üretildikçe tampona eklenir ve her ROW_GROUP_SIZE satırda bir
+satır grubu olarak diske yazılır; veri setinin tamamı hiçbir zaman
+bellekte tutulmaz. MFCC matrisleri iç içe float listesi yerine
+(katsayı, çerçeve) biçimli, float32 ya da float16 tipli bir liste
+sütununda saklanır.
+
+ShardedParquetWriter yükleme tarafında birçok videonun satırlarını hedef
+boyutlu parçalara (train-00000.parquet, train-00001.parquet, ...) akış halinde yazar;
+matrix_rows bu sütunları yeniden 2-B dizilere çevirir.
+"""
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Bir satır grubundaki kayıt sayısı
+ROW_GROUP_SIZE = 256
+
+# MFCC sütunu için desteklenen tipler
+MFCC_DTYPES = {
+    "float32": (np.float32, pa.float32()),
+    "float16": (np.float16, pa.float16()),
+}
+
+def record_schema(mfcc_dtype="float32"):
+    """processed_dataset kayıtlarının Arrow şeması."""
+    value_type = MFCC_DTYPES[mfcc_dtype][1]
+    return pa.schema([
+        ("segment_id", pa.string()),
+        ("audio_file", pa.string()),
+        ("transcription", pa.string()),
+        ("spectrogram", pa.string()),
+        ("mel", pa.string()),
+        ("mfcc", pa.list_(pa.list_(value_type))),
+        ("tokens", pa.list_(pa.string())),
+        ("token_ids", pa.list_(pa.int32())),
+    ])
+
+def matrix_column(matrices, np_dtype, value_type):
+    """2-B dizileri kopyalamadan tek seferde list<list<değer>> sütununa çevirir."""
+    rows = [np.asarray(matrix, dtype=np_dtype) for matrix in matrices]
+    inner_lengths = [row.shape[1] for row in rows for _ in range(row.shape[0])]
+    inner_offsets = np.zeros(len(inner_lengths) + 1, dtype=np.int32)
+    np.cumsum(inner_lengths, out=inner_offsets[1:])
+    outer_offsets = np.zeros(len(rows) + 1, dtype=np.int32)
+    np.cumsum([row.shape[0] for row in rows], out=outer_offsets[1:])
+
+    values = np.concatenate([row.ravel() for row in rows]) if rows else np.empty(0, dtype=np_dtype)
+    inner = pa.ListArray.from_arrays(pa.array(inner_offsets), pa.array(values, type=value_type))
+    return pa.ListArray.from_arrays(pa.array(outer_offsets), inner)
+
+def matrix_rows(column):
+    """list<list<değer>> sütununun satırlarını kopyalamadan 2-B numpy dizileri olarak üretir.
+
+    matrix_column'ın tersidir; boş (null) satırlar için None üretilir.
+    """
+    chunks = column.chunks if isinstance(column, pa.ChunkedArray) else [column]
+    for chunk in chunks:
+        valid = chunk.is_valid().to_numpy(zero_copy_only=False)
+        outer_offsets = chunk.offsets.to_numpy()
+        inner_offsets = chunk.values.offsets.to_numpy()
+        values = chunk.values.values.to_numpy(zero_copy_only=False)
+        for i in range(len(chunk)):
+            if not valid[i]:
+                yield None
+                continue
+            start, end = outer_offsets[i], outer_offsets[i + 1]
+            flat = values[inner_offsets[start]:inner_offsets[end]]
+            yield flat.reshape(end - start, -1) if end > start else flat.reshape(0, 0)
+
+def leaf_paths(name, arrow_type):
+    """Bir sütunun Parquet yaprak sütun yolları (ör. mfcc.list.element.list.element)."""
+    if isinstance(arrow_type, pa.ExtensionType):
+        arrow_type = arrow_type.storage_type
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type) or pa.types.is_fixed_size_list(arrow_type):
+        return leaf_paths(f"{name}.list.element", arrow_type.value_type)
+    if pa.types.is_struct(arrow_type):
+        return [path for field in arrow_type for path in leaf_paths(f"{name}.{field.name}", field.type)]
+    return [name]
+
+class RecordWriter:
+    """Kayıtları satır grupları halinde Parquet dosyasına ekleyen yazıcı.
+
+    with bloğuyla kullanılır; çıkışta tampondaki kayıtlar yazılıp dosya
+    kapatılır.
+    """
+
+    def __init__(self, path, mfcc_dtype="float32", row_group_size=ROW_GROUP_SIZE):
+        self.path = path
+        self.np_dtype, self.value_type = MFCC_DTYPES[mfcc_dtype]
+        self.schema = record_schema(mfcc_dtype)
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._pending = []
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, record):
+        self._pending.append(record)
+        if len(self._pending) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        records = self._pending
+        self._pending = []
+        columns = {
+            name: pa.array([record.get(name) for record in records], type=self.schema.field(name).type)
+            for name in self.schema.names if name != "mfcc"
+        }
+        columns["mfcc"] = matrix_column([record["mfcc"] for record in records], self.np_dtype, self.value_type)
+        self._writer.write_table(pa.table(columns, schema=self.schema))
+        self.rows += len(records)
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Yükleme parçaları için varsayılanlar: parça başına hedef boyut ve satır
+# grubu başına satır sayısı (gömülü ses/görsel içeren satırlar büyüktür)
+SHARD_TARGET_BYTES = 500 * 1024 ** 2
+SHARD_ROW_GROUP_ROWS = 100
+
+class ShardedParquetWriter:
+    """Satırları max_bytes/max_rows sınırında yenisine geçen <split>-<numara>.parquet parçalarına yazar.
+
+    Numaralar start_number'dan başlar; parçalar close() ile son adlarını alır.
+    """
+
+    def __init__(self, directory, schema, split="train", start_number=0, max_bytes=SHARD_TARGET_BYTES,
+                 max_rows=None, row_group_rows=SHARD_ROW_GROUP_ROWS, byte_stream_split=()):
+        self.directory = directory
+        self.schema = schema
+        self.split = split
+        self.start_number = start_number
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.row_group_rows = row_group_rows
+        self.rows = 0
+        self._temp_paths = []
+        self._writer = None
+        self._file = None
+        self._shard_rows = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._pending_bytes = 0
+        self._writer_options = {"compression": "zstd"}
+        # Kayan noktalı tensör sütunları sözlük yerine BYTE_STREAM_SPLIT ile
+        # yazılır; zstd bu düzeni daha iyi sıkıştırır
+        if byte_stream_split:
+            self._writer_options["use_byte_stream_split"] = [
+                path for name in byte_stream_split for path in leaf_paths(name, schema.field(name).type)
+            ]
+            self._writer_options["use_dictionary"] = [
+                path for field in schema if field.name not in byte_stream_split
+                for path in leaf_paths(field.name, field.type)
+            ]
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_next(self):
+        path = os.path.join(self.directory, f".{self.split}-{len(self._temp_paths):05d}.parquet.tmp")
+        self._temp_paths.append(path)
+        self._file = open(path, "wb")
+        self._writer = pq.ParquetWriter(self._file, self.schema, **self._writer_options)
+        self._shard_rows = 0
+
+    def _close_current(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._file.close()
+            self._writer = None
+            self._file = None
+            self._shard_rows = 0
+
+    def write(self, table):
+        """Şemaya uyan bir Arrow tablosunu ekler; satır grupları dolduğunda diske yazılır.
+
+        Bekleyen satırlar max_bytes'ın dörtte birini aşarsa grup erken
+        yazılır, böylece parçalar hedefi en fazla bir grup kadar aşar.
+        """
+        table = table.cast(self.schema)
+        offset = 0
+        while offset < table.num_rows:
+            take = self.row_group_rows - self._pending_rows
+            if self.max_rows:
+                take = min(take, self.max_rows - self._shard_rows - self._pending_rows)
+            piece = table.slice(offset, take)
+            self._pending.append(piece)
+            self._pending_rows += piece.num_rows
+            self._pending_bytes += piece.nbytes
+            offset += piece.num_rows
+            if (
+                self._pending_rows >= self.row_group_rows
+                or self._pending_bytes >= self.max_bytes // 4
+                or (self.max_rows and self._shard_rows + self._pending_rows >= self.max_rows)
+            ):
+                self._flush_row_group()
+
+    def _flush_row_group(self):
+        if not self._pending_rows:
+            return
+        if self._writer is None:
+            self._open_next()
+        self._writer.write_table(pa.concat_tables(self._pending), row_group_size=self._pending_rows)
+        self._shard_rows += self._pending_rows
+        self.rows += self._pending_rows
+        self._pending = []
+        self._pending_rows = 0
+        self._pending_bytes = 0
+
+        # Parça hedef boyuta ya da satır sayısına ulaştıysa sonraki satırlar yeni parçaya
+        if self._file.tell() >= self.max_bytes or (self.max_rows and self._shard_rows >= self.max_rows):
+            self._close_current()
+
+    def close(self):
+        """Kalan satırları yazar, parçaları son adlarına taşır ve yollarını döndürür."""
+        self._flush_row_group()
+        self._close_current()
+        paths = []
+        for i, temp_path in enumerate(self._temp_paths):
+            path = os.path.join(self.directory, f"{self.split}-{self.start_number + i:05d}.parquet")
+            os.replace(temp_path, path)
+            paths.append(path)
+        self._temp_paths = []
+        return paths
+
+    def abort(self):
+        """Yarım kalan parçaları siler."""
+        self._close_current()
+        for temp_path in self._temp_paths:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        self._temp_paths = []
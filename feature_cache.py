@@ -0,0 +1,132 @@
+"""Ses içeriğine ve öznitelik ayarlarına göre adreslenen kalıcı öznitelik önbelleği.
+
+Her girdi, içeriğinin bağlı olduğu her şeyi (ses dosyasının SHA-256 özeti,
+örnekleme hızı, n_fft, n_mels, n_mfcc, tokenizer adı, ...) kapsayan bir
+anahtarla saklanır. Öznitelikler ayrı anahtarlar aldığından bir parametre
+değiştiğinde yalnızca ondan etkilenen öznitelik yeniden hesaplanır.
+
+Girdiler <önbellek>/<tür>/<anahtarın ilk 2 karakteri>/<anahtar> altında
+tutulur. Okunan girdinin değişiklik zamanı güncellenir; toplam boyut
+sınırı aşılınca en uzun süredir kullanılmayan girdiler silinir (LRU).
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+
+CACHE_DIR = os.environ.get("SAYHA_FEATURE_CACHE", "feature_cache")
+# Varsayılan boyut sınırı (bayt)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Temizlikten sonra sınırın bu oranına kadar yer açılır
+EVICT_TARGET = 0.9
+
+def file_digest(path, chunk_size=1 << 20):
+    """Dosya içeriğinin SHA-256 özetini döndürür."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_key(*parts):
+    """Parçaların (JSON'a çevrilebilir değerler) kararlı özetini döndürür."""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class FeatureCache:
+    """Boyut sınırlı, LRU temizlikli, içerik adresli disk önbelleği.
+
+    Yazmalar geçici dosya + os.replace ile yapılır; aynı klasörü kullanan
+    birden fazla süreç birbirinin yarım yazılmış girdisini görmez.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        # Boyut bir kez taranır, sonra yazmalarla birlikte güncellenir
+        self.size = sum(size for _, _, size in self._entries())
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, key[:2], key)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.startswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def get(self, kind, key):
+        """Girdinin baytlarını döndürür; yoksa None."""
+        path = self._path(kind, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, kind, key, data):
+        """Baytları atomik olarak yazar ve gerekirse eski girdileri temizler."""
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Üzerine yazılan girdinin boyutu toplamdan düşülür
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.size += len(data) - replaced
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def get_array(self, kind, key):
+        data = self.get(kind, key)
+        return None if data is None else np.load(io.BytesIO(data), allow_pickle=False)
+
+    def put_array(self, kind, key, array):
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(array), allow_pickle=False)
+        self.put(kind, key, buffer.getvalue())
+
+    def get_json(self, kind, key):
+        data = self.get(kind, key)
+        return None if data is None else json.loads(data.decode("utf-8"))
+
+    def put_json(self, kind, key, value):
+        self.put(kind, key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def evict(self):
+        """En eski girdileri, toplam boyut sınırın EVICT_TARGET oranına inene kadar siler."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * EVICT_TARGET
+        for path, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self.size = total
@@ -0,0 +1,184 @@
+"""Ortak STFT/mel hattı: bir segmentin STFT'si bir kez hesaplanır.
+
+Mel, log-mel, MFCC, delta ve enerji gibi tüm öznitelikler aynı güç
+spektrumundan türetilir. Pencere, mel filtre bankası ve DCT matrisi
+(sr, n_fft, n_mels) başına bir kez oluşturulup önbellekte tutulur.
+Varsayılanlar librosa.feature.melspectrogram / mfcc ile aynıdır.
+
+Kısa segmentlerde çağrı başına ek yükü azaltmak için analyze_batch benzer
+uzunluktaki segmentleri sıfırla doldurup tek bir 2-B dizide işler; sonuçlar
+segment başına geçerli çerçevelere kırpılır.
+"""
+from functools import cached_property, lru_cache
+
+import numpy as np
+
+# librosa.power_to_db ile aynı alt sınır
+AMIN = 1e-10
+
+# Varsayılan mel bandı ve MFCC katsayısı sayıları
+N_MELS = 128
+N_MFCC = 13
+
+@lru_cache(maxsize=None)
+def stft_window(n_fft):
+    """Periyodik Hann penceresi (scipy.signal.get_window('hann', n_fft))."""
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+
+@lru_cache(maxsize=None)
+def mel_filterbank(sr, n_fft, n_mels):
+    """librosa'nın Slaney mel filtre bankası; her (sr, n_fft, n_mels) için bir kez kurulur."""
+    import librosa
+    return librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).astype(np.float32)
+
+@lru_cache(maxsize=None)
+def dct_matrix(n_mfcc, n_mels):
+    """Ortonormal DCT-II matrisinin ilk n_mfcc satırı (scipy.fft.dct(norm='ortho'))."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+def frame_signal(y, n_fft, hop_length):
+    """Sinyali librosa'nın center=True davranışıyla (sıfır dolgu) çerçevelere ayırır.
+
+    Son eksen zaman eksenidir; (segment, örnek) boyutlu toplu girişte
+    (segment, çerçeve, n_fft) döner.
+    """
+    lead = [(0, 0)] * (y.ndim - 1)
+    y = np.pad(y, lead + [(n_fft // 2, n_fft // 2)])
+    if y.shape[-1] < n_fft:
+        y = np.pad(y, lead + [(0, n_fft - y.shape[-1])])
+    return np.lib.stride_tricks.sliding_window_view(y, n_fft, axis=-1)[..., ::hop_length, :]
+
+def frame_count(length, hop_length):
+    """center=True ile length örneklik sinyalin çerçeve sayısı."""
+    return 1 + length // hop_length
+
+def length_batches(lengths, batch_size=16, max_pad_ratio=1.25):
+    """Segment indekslerini uzunluğa göre sıralayıp benzer uzunluktaki gruplara ayırır.
+
+    Bir gruptaki en uzun segment en kısanın max_pad_ratio katını
+    geçmez; böylece dolguya harcanan hesap sınırlı kalır.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batch = []
+    for i in order:
+        if batch and (len(batch) >= batch_size or lengths[i] > max(1, lengths[batch[0]]) * max_pad_ratio):
+            yield batch
+            batch = []
+        batch.append(i)
+    if batch:
+        yield batch
+
+def power_to_db(power, ref=1.0, top_db=80.0):
+    """librosa.power_to_db'nin son iki eksen üzerinde çalışan karşılığı."""
+    log_spec = 10.0 * np.log10(np.maximum(AMIN, power))
+    log_spec -= 10.0 * np.log10(np.maximum(AMIN, ref))
+    if top_db is not None:
+        peak = log_spec.max(axis=(-2, -1), keepdims=True)
+        log_spec = np.maximum(log_spec, peak - top_db)
+    return log_spec
+
+class SegmentFeatures:
+    """Tek bir segmentin öznitelikleri; her biri ilk erişimde hesaplanıp saklanır."""
+
+    def __init__(self, engine, y, sr, **precomputed):
+        self.engine = engine
+        self.y = np.asarray(y, dtype=np.float32)
+        self.sr = sr
+        # Toplu hesaplanmış değerler (mel, log_mel, mfcc, energy) önbelleğe yerleşir
+        self.__dict__.update(precomputed)
+
+    @cached_property
+    def power(self):
+        """Güç spektrumu (1 + n_fft/2, çerçeve)."""
+        return self.engine.power_spectrum(self.y)
+
+    @cached_property
+    def mel(self):
+        """Mel güç spektrogramı (n_mels, çerçeve)."""
+        return mel_filterbank(self.sr, self.engine.n_fft, self.engine.n_mels) @ self.power
+
+    @cached_property
+    def log_mel(self):
+        """ref=1.0 ile dB ölçeğinde mel spektrogram (MFCC girişi)."""
+        return power_to_db(self.mel, top_db=self.engine.top_db)
+
+    @cached_property
+    def mel_db(self):
+        """En yüksek değere göre dB ölçeğinde mel spektrogram (görseller için)."""
+        return self.log_mel - 10.0 * np.log10(max(AMIN, float(self.mel.max())))
+
+    @cached_property
+    def mfcc(self):
+        """MFCC katsayıları (n_mfcc, çerçeve)."""
+        return dct_matrix(self.engine.n_mfcc, self.engine.n_mels) @ self.log_mel
+
+    @cached_property
+    def mfcc_delta(self):
+        """MFCC'lerin birinci dereceden zaman farkı."""
+        return np.gradient(self.mfcc, axis=-1) if self.mfcc.shape[-1] > 1 else np.zeros_like(self.mfcc)
+
+    @cached_property
+    def energy(self):
+        """Çerçeve başına toplam spektral enerji."""
+        return self.power.sum(axis=0)
+
+class FeatureEngine:
+    """STFT ayarlarını tutan ve segment öznitelikleri üreten motor."""
+
+    def __init__(self, n_fft=2048, hop_length=512, n_mels=N_MELS, n_mfcc=N_MFCC, top_db=80.0):
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.n_mfcc = n_mfcc
+        self.top_db = top_db
+
+    def power_spectrum(self, y):
+        """(..., örnek) sinyal(ler)in (..., 1 + n_fft/2, çerçeve) güç spektrumu."""
+        frames = frame_signal(y, self.n_fft, self.hop_length)
+        spectrum = np.fft.rfft(frames * stft_window(self.n_fft), axis=-1)
+        return np.swapaxes(np.square(np.abs(spectrum)), -1, -2).astype(np.float32)
+
+    def analyze(self, y, sr):
+        """Segment için tembel hesaplanan SegmentFeatures döndürür."""
+        return SegmentFeatures(self, y, sr)
+
+    def analyze_batch(self, signals, sr, batch_size=16, max_pad_ratio=1.25):
+        """Aynı örnekleme hızındaki segmentleri toplu işleyip giriş sırasıyla SegmentFeatures listesi döndürür.
+
+        Benzer uzunluktaki segmentler sağdan sıfırla doldurulup tek seferde
+        STFT, mel, log-mel ve MFCC'ye çevrilir. Dolgu yalnızca geçerli
+        çerçevelerin ötesine sıfır ekler ve top_db tepe değeri segment
+        başına alınır; kırpılan sonuçlar analyze ile aynı çerçevelerden
+        hesaplanır. Tolerans: MFCC ve dB değerlerinde mutlak 1e-4, mel
+        gücünde göreli 1e-6 (pratikte fark sıfırdır).
+        """
+        signals = [np.asarray(y, dtype=np.float32) for y in signals]
+        lengths = [len(y) for y in signals]
+        results = [None] * len(signals)
+
+        for batch in length_batches(lengths, batch_size, max_pad_ratio):
+            padded = np.zeros((len(batch), max(lengths[i] for i in batch)), dtype=np.float32)
+            for row, i in enumerate(batch):
+                padded[row, :lengths[i]] = signals[i]
+
+            power = self.power_spectrum(padded)
+            mel = mel_filterbank(sr, self.n_fft, self.n_mels) @ power
+            log_mel = power_to_db(mel, top_db=self.top_db)
+            mfcc = dct_matrix(self.n_mfcc, self.n_mels) @ log_mel
+            energy = power.sum(axis=-2)
+            del power
+
+            for row, i in enumerate(batch):
+                frames = frame_count(lengths[i], self.hop_length)
+                results[i] = SegmentFeatures(
+                    self, signals[i], sr,
+                    mel=mel[row, :, :frames].copy(),
+                    log_mel=log_mel[row, :, :frames].copy(),
+                    mfcc=mfcc[row, :, :frames].copy(),
+                    energy=energy[row, :frames].copy(),
+                )
+        return results
@@ -1,6 +1,9 @@
 import os
 import json
 
+# Bölücünün yazabildiği ses biçimleri
+AUDIO_EXTENSIONS = (".mp3", ".flac", ".wav", ".opus")
+
 # Output klasörünün yolu
 output_folder = "output"
 
@@ -10,7 +13,7 @@ dataset = []
 # Klasörleri ve dosyaları tarama
 for root, dirs, files in os.walk(output_folder):
     for file in files:
-        if file.endswith(".mp3"):
+        if file.endswith(AUDIO_EXTENSIONS):
             # Dosya yolunu al
             audio_file = os.path.join(root, file)
             
@@ -0,0 +1,357 @@
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+# Varsayılan veritabanı yolu; SAYHA_LEDGER_PATH ile değiştirilebilir
+LEDGER_PATH = os.getenv("SAYHA_LEDGER_PATH", "pipeline_ledger.db")
+
+# Eski metin kayıtları (tek seferlik içe aktarma için)
+DOWNLOADED_TXT = "downloaded_videos.txt"
+UPLOADED_TXT = "uploaded_to_huggingface.txt"
+
+# İşlem hattı aşamaları, sırasıyla
+STAGES = ("discovered", "downloaded", "split", "featurized", "uploaded")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id      TEXT PRIMARY KEY,
+    url           TEXT,
+    stage         TEXT NOT NULL,
+    stage_rank    INTEGER NOT NULL,
+    claimed_by    TEXT,
+    claimed_at    REAL,
+    error         TEXT,
+    discovered_at REAL,
+    downloaded_at REAL,
+    split_at      REAL,
+    featurized_at REAL,
+    uploaded_at   REAL,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_stage ON videos (stage_rank, claimed_by);
+
+CREATE TABLE IF NOT EXISTS uploads (
+    path        TEXT PRIMARY KEY,
+    video_id    TEXT,
+    uploaded_at REAL NOT NULL
+);
+
+-- Hugging Face'e gönderilmek üzere yazılan parçalar; aynı batch'teki
+-- parçaların tümü commit edilince datasets (JSON liste) yüklendi sayılır
+CREATE TABLE IF NOT EXISTS upload_shards (
+    name         TEXT PRIMARY KEY,
+    batch        TEXT NOT NULL,
+    local_path   TEXT NOT NULL,
+    datasets     TEXT NOT NULL,
+    committed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_upload_shards_batch ON upload_shards (batch, committed_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _stage_rank(stage):
+    if stage not in STAGES:
+        raise ValueError(f"Bilinmeyen aşama: {stage} (geçerli: {', '.join(STAGES)})")
+    return STAGES.index(stage)
+
+def default_worker_id():
+    """Talep (claim) kayıtlarında kullanılacak makine/süreç kimliği."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class PipelineLedger:
+    """Videoların işlem hattındaki durumunu tutan SQLite tabanlı kayıt defteri.
+
+    Her video için bulunduğu aşama ve her aşamanın tamamlanma zamanı
+    saklanır. Aramalar birincil anahtar üzerinden yapılır; yazmalar
+    işlemseldir (WAL kipi), bu yüzden birden fazla süreç aynı dosyayı
+    güvenle paylaşabilir.
+    """
+
+    def __init__(self, path=LEDGER_PATH, timeout=30.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _transaction(self, fn):
+        """fn(conn) çağrısını BEGIN IMMEDIATE işlemi içinde çalıştırır."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def add(self, video_id, url=None):
+        """Videoyu 'discovered' aşamasında kaydeder; zaten varsa dokunmaz."""
+        now = time.time()
+
+        def run(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO videos (video_id, url, stage, stage_rank, discovered_at, updated_at) "
+                "VALUES (?, ?, 'discovered', 0, ?, ?)",
+                (video_id, url, now, now),
+            )
+            if url:
+                conn.execute("UPDATE videos SET url = COALESCE(url, ?) WHERE video_id = ?", (url, video_id))
+
+        self._transaction(run)
+
+    def mark(self, video_id, stage, timestamp=None, release=True):
+        """Videonun stage aşamasını tamamladığını kaydeder ve talebini bırakır.
+
+        Aşama yalnızca ileri taşınır; daha geri bir aşamanın tekrar
+        işaretlenmesi yalnızca o aşamanın zamanını günceller. release=False
+        ise talep, sonraki aşama için korunur.
+        """
+        now = timestamp or time.time()
+        self._transaction(lambda conn: self._mark(conn, video_id, stage, now, release))
+
+    def _mark(self, conn, video_id, stage, now, release=True):
+        rank = _stage_rank(stage)
+        conn.execute(
+            "INSERT OR IGNORE INTO videos (video_id, stage, stage_rank, discovered_at, updated_at) "
+            "VALUES (?, 'discovered', 0, ?, ?)",
+            (video_id, now, now),
+        )
+        conn.execute(
+            f"UPDATE videos SET {stage}_at = ?, updated_at = ?, "
+            "stage = CASE WHEN stage_rank < ? THEN ? ELSE stage END, "
+            "stage_rank = MAX(stage_rank, ?), error = NULL"
+            + (", claimed_by = NULL, claimed_at = NULL" if release else "")
+            + " WHERE video_id = ?",
+            (now, now, rank, stage, rank, video_id),
+        )
+
+    def has_reached(self, video_id, stage):
+        """Video en az stage aşamasına ulaşmışsa True döndürür."""
+        rows = self._query("SELECT stage_rank FROM videos WHERE video_id = ?", (video_id,))
+        return bool(rows) and rows[0]["stage_rank"] >= _stage_rank(stage)
+
+    def get(self, video_id):
+        """Videonun kaydını sözlük olarak döndürür (yoksa None)."""
+        rows = self._query("SELECT * FROM videos WHERE video_id = ?", (video_id,))
+        return dict(rows[0]) if rows else None
+
+    def claim(self, stage, worker_id=None, lease_seconds=3600, video_id=None):
+        """stage aşamasını üretmek için sıradaki uygun videoyu atomik olarak talep eder.
+
+        Bir önceki aşamada bekleyen ve talep edilmemiş (ya da talebinin
+        süresi dolmuş) ilk video işaretlenir ve kimliği döndürülür; uygun
+        video yoksa None döner. video_id verilirse yalnızca o video, stage
+        aşamasına henüz ulaşmamışsa ve başka bir süreçte değilse talep edilir.
+        """
+        rank = _stage_rank(stage)
+        if rank == 0:
+            raise ValueError("'discovered' aşaması talep edilemez, add() kullanın")
+        worker_id = worker_id or default_worker_id()
+        now = time.time()
+
+        def run(conn):
+            if video_id is not None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO videos (video_id, stage, stage_rank, discovered_at, updated_at) "
+                    "VALUES (?, 'discovered', 0, ?, ?)",
+                    (video_id, now, now),
+                )
+                row = conn.execute(
+                    "SELECT video_id FROM videos "
+                    "WHERE video_id = ? AND stage_rank < ? AND (claimed_by IS NULL OR claimed_at < ?)",
+                    (video_id, rank, now - lease_seconds),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT video_id FROM videos "
+                    "WHERE stage_rank = ? AND (claimed_by IS NULL OR claimed_at < ?) "
+                    "ORDER BY updated_at LIMIT 1",
+                    (rank - 1, now - lease_seconds),
+                ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE videos SET claimed_by = ?, claimed_at = ? WHERE video_id = ?",
+                (worker_id, now, row["video_id"]),
+            )
+            return row["video_id"]
+
+        return self._transaction(run)
+
+    def release(self, video_id, error=None):
+        """Talebi aşama ilerletmeden bırakır; varsa hata mesajını saklar."""
+        def run(conn):
+            conn.execute(
+                "UPDATE videos SET claimed_by = NULL, claimed_at = NULL, error = ?, updated_at = ? "
+                "WHERE video_id = ?",
+                (error, time.time(), video_id),
+            )
+
+        self._transaction(run)
+
+    def is_uploaded(self, path):
+        """Dosya daha önce yüklendiyse True döndürür."""
+        return bool(self._query("SELECT 1 FROM uploads WHERE path = ?", (path,)))
+
+    def stage_upload_shards(self, batch, shards, datasets):
+        """Commit edilecek parçaları kaydeder.
+
+        shards: [(repo içindeki ad, yerel yol)], datasets: [(veri seti yolu,
+        video_id)]. Veri setleri, batch'in tüm parçaları commit edilince
+        yüklendi olarak işlenir.
+        """
+        encoded = json.dumps(datasets, ensure_ascii=False)
+
+        def run(conn):
+            conn.executemany(
+                "INSERT OR REPLACE INTO upload_shards (name, batch, local_path, datasets) VALUES (?, ?, ?, ?)",
+                [(name, batch, local_path, encoded) for name, local_path in shards],
+            )
+
+        self._transaction(run)
+
+    def commit_upload_shards(self, names):
+        """Parçaları commit edildi olarak işaretler.
+
+        Tüm parçaları commit edilen batch'lerin veri setleri aynı işlemde
+        yüklendi olarak kaydedilir; bunların yolları döndürülür.
+        """
+        now = time.time()
+
+        def run(conn):
+            placeholders = ", ".join("?" * len(names))
+            conn.execute(
+                f"UPDATE upload_shards SET committed_at = ? WHERE name IN ({placeholders}) AND committed_at IS NULL",
+                (now, *names),
+            )
+            done = conn.execute(
+                f"SELECT DISTINCT batch, datasets FROM upload_shards WHERE name IN ({placeholders}) "
+                "AND batch NOT IN (SELECT batch FROM upload_shards WHERE committed_at IS NULL)",
+                tuple(names),
+            ).fetchall()
+            recorded = []
+            for row in done:
+                for path, video_id in json.loads(row["datasets"]):
+                    conn.execute(
+                        "INSERT OR IGNORE INTO uploads (path, video_id, uploaded_at) VALUES (?, ?, ?)",
+                        (path, video_id, now),
+                    )
+                    if video_id:
+                        self._mark(conn, video_id, "uploaded", now)
+                    recorded.append(path)
+            return recorded
+
+        return self._transaction(run) if names else []
+
+    def pending_upload_shards(self):
+        """Henüz commit edilmemiş parçaları ad sırasıyla döndürür."""
+        rows = self._query("SELECT * FROM upload_shards WHERE committed_at IS NULL ORDER BY name")
+        return [dict(row) for row in rows]
+
+    def drop_upload_batch(self, batch):
+        """Bir batch'in commit edilmemiş parça kayıtlarını siler; veri setleri yüklenmemiş kalır."""
+        self._transaction(lambda conn: conn.execute(
+            "DELETE FROM upload_shards WHERE batch = ? AND committed_at IS NULL", (batch,)
+        ))
+
+    def import_text_ledgers(self, downloaded_txt=DOWNLOADED_TXT, uploaded_txt=UPLOADED_TXT, force=False):
+        """Eski downloaded_videos.txt ve uploaded_to_huggingface.txt kayıtlarını içe aktarır.
+
+        İçe aktarma bir kez yapılır ve meta tablosuna işlenir; force=True
+        ile tekrar çalıştırılabilir. İçe aktarılan kayıt sayılarını döndürür.
+        """
+        if not force and self._query("SELECT 1 FROM meta WHERE key = 'txt_imported'"):
+            return 0, 0
+
+        downloaded = []
+        if os.path.exists(downloaded_txt):
+            with open(downloaded_txt, "r", encoding="utf-8") as f:
+                downloaded = [line.strip() for line in f if line.strip()]
+
+        uploaded = []
+        if os.path.exists(uploaded_txt):
+            with open(uploaded_txt, "r", encoding="utf-8") as f:
+                uploaded = [line.strip() for line in f if line.strip()]
+
+        now = time.time()
+
+        def run(conn):
+            # downloaded_videos.txt bölme işleminden sonra yazılıyordu
+            for video_id in downloaded:
+                conn.execute(
+                    "INSERT OR IGNORE INTO videos (video_id, stage, stage_rank, discovered_at, "
+                    "downloaded_at, split_at, updated_at) VALUES (?, 'split', 2, ?, ?, ?, ?)",
+                    (video_id, now, now, now, now),
+                )
+            for path in uploaded:
+                video_id = os.path.basename(path.replace("\\", "/")).split("_processed_dataset.json")[0]
+                conn.execute(
+                    "INSERT OR IGNORE INTO uploads (path, video_id, uploaded_at) VALUES (?, ?, ?)",
+                    (path, video_id, now),
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO videos (video_id, stage, stage_rank, discovered_at, updated_at) "
+                    "VALUES (?, 'uploaded', 4, ?, ?)",
+                    (video_id, now, now),
+                )
+                conn.execute(
+                    "UPDATE videos SET stage = 'uploaded', stage_rank = 4, uploaded_at = ?, updated_at = ? "
+                    "WHERE video_id = ?",
+                    (now, now, video_id),
+                )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('txt_imported', ?)", (str(now),))
+
+        self._transaction(run)
+        return len(downloaded), len(uploaded)
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+def get_ledger(path=LEDGER_PATH):
+    """Süreç başına tek bir kayıt defteri bağlantısı döndürür.
+
+    İlk açılışta eski metin kayıtları otomatik olarak içe aktarılır.
+    """
+    with _ledgers_lock:
+        if path not in _ledgers:
+            ledger = PipelineLedger(path)
+            ledger.import_text_ledgers()
+            _ledgers[path] = ledger
+        return _ledgers[path]
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "status"):
+        print("Kullanım: python pipeline_ledger.py import|status [video_id]")
+        return
+
+    ledger = PipelineLedger()
+    if sys.argv[1] == "import":
+        downloaded, uploaded = ledger.import_text_ledgers(force=True)
+        print(f"İçe aktarıldı: {downloaded} indirilen video, {uploaded} yüklenen dosya.")
+    elif len(sys.argv) > 2:
+        print(ledger.get(sys.argv[2]) or "Kayıt bulunamadı.")
+    else:
+        for row in ledger._query("SELECT stage, COUNT(*) AS n FROM videos GROUP BY stage_rank ORDER BY stage_rank"):
+            print(f"{row['stage']}: {row['n']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,726 @@
+"""Ses segmentlerinden mel spektrogram, MFCC ve token öznitelikleri çıkarır.
+
+Modül içe aktarıldığında hiçbir iş yapmaz; librosa, matplotlib ve
+tokenizer gibi ağır bağımlılıklar ilk kullanıldıkları anda yüklenir.
+Komut satırından çalıştırıldığında output/ altındaki tüm ses dosyalarını
+işler ve kayıtları üretildikçe output/dataset altındaki Parquet dosyasına
+yazar (--output-format json ile eski JSON çıktısı da alınabilir).
+"""
+import argparse
+import io
 import os
 import json
-import librosa
-import librosa.display
-import matplotlib.pyplot as plt
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
-from transformers import AutoTokenizer
+from feature_cache import CACHE_DIR, DEFAULT_MAX_BYTES, FeatureCache, cache_key, file_digest
+from feature_engine import FeatureEngine
+from pipeline_ledger import get_ledger
+from shard_store import is_shard_ref, iter_samples, iter_shard_dirs, shard_ref, split_shard_ref
+from spectrogram_image import save_mel_png
+
+# Bölücünün yazabildiği ses biçimleri
+AUDIO_EXTENSIONS = (".mp3", ".flac", ".wav", ".opus")
 
 # Giriş ve çıkış klasörleri
-input_folder = "output"
-output_base = "output"
-json_output_folder = os.path.join(output_base, "json")
-spectrogram_output_folder = os.path.join(output_base, "spectrogram")
-
-# Tokenizer'ı yükle (örneğin, BERT tokenizer)
-tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
-
-# Çıkış klasörlerini oluştur
-os.makedirs(json_output_folder, exist_ok=True)
-os.makedirs(spectrogram_output_folder, exist_ok=True)
-
-# Veri setini tutacak liste
-dataset = []
-
-# Video klasörünü bul (output/audio altındaki ilk klasör)
-audio_folders = [f for f in os.listdir(os.path.join(input_folder, "audio")) if os.path.isdir(os.path.join(input_folder, "audio", f))]
-if not audio_folders:
-    raise ValueError("Audio klasöründe video klasörü bulunamadı!")
-
-video_id = audio_folders[0]  # İlk klasörü al (video_id)
-
-# Klasörleri ve dosyaları tarama
-for root, dirs, files in os.walk(input_folder):
-    for file in files:
-        if file.endswith(".mp3"):
-            # Dosya yolunu al
-            audio_path = os.path.join(root, file)
-            
-            # Dosya adından metni çıkar
-            transcription = os.path.splitext(file)[0]  # Uzantıyı kaldır
-            transcription = "_".join(transcription.split("_")[1:])  # İlk kısmı (numara) kaldır
-            transcription = transcription.replace("_", " ")  # Alt çizgileri boşlukla değiştir
-            
+INPUT_FOLDER = "output"
+OUTPUT_BASE = "output"
+
+# Varsayılan tokenizer (örneğin, BERT tokenizer)
+TOKENIZER_NAME = "bert-base-uncased"
+
+# Spektrogram çıktı kipleri:
+#   png        - dB mel matrisi renk tablosuyla doğrudan PNG'ye yazılır (hızlı)
+#   matplotlib - eksenli ve renk çubuklu eski pyplot figürü
+#   none       - görsel üretilmez, dB mel matrisi .npy olarak saklanır
+SPECTROGRAM_MODES = ("png", "matplotlib", "none")
+
+# Veri seti çıktı biçimleri
+OUTPUT_FORMATS = ("parquet", "json")
+
+# Toplu kipte tek seferde yüklenen dosya sayısı = batch_size * LOAD_WINDOW;
+# uzunluğa göre gruplama bu pencere içinde yapılır
+DEFAULT_BATCH_SIZE = 16
+LOAD_WINDOW = 8
+
+def transcription_from_filename(file):
+    """Dosya adından metni çıkarır ("003_kara_haber_var.mp3" -> "kara haber var")."""
+    transcription = os.path.splitext(file)[0]  # Uzantıyı kaldır
+    transcription = "_".join(transcription.split("_")[1:])  # İlk kısmı (numara) kaldır
+    return transcription.replace("_", " ")  # Alt çizgileri boşlukla değiştir
+
+def segment_file_name(audio_path):
+    """Segmentin dosya adı; parça başvurularında (shard://klasör#üye) üye adı."""
+    if is_shard_ref(audio_path):
+        return split_shard_ref(audio_path)[1]
+    return os.path.basename(audio_path)
+
+def segment_key(audio_path):
+    """Segment yolundan (video_id, cue numarası) döndürür.
+
+    output/audio/<video_id>/<cue>_<metin>.<uzantı> dosyaları ve
+    shard://output/shards/<video_id>#<cue>.<uzantı> parça başvuruları desteklenir.
+    """
+    folder = split_shard_ref(audio_path)[0] if is_shard_ref(audio_path) else os.path.dirname(audio_path)
+    video_id = os.path.basename(os.path.abspath(folder))
+    cue = os.path.splitext(segment_file_name(audio_path))[0].split("_")[0]
+    return video_id, cue
+
+def segment_id(audio_path):
+    """Segmentin (video_id, cue numarası) ikilisinden türetilen kalıcı kimliği."""
+    return "_".join(segment_key(audio_path))
+
+def find_video_id(input_folder=INPUT_FOLDER):
+    """output/audio altındaki ilk video klasörünün adını (video_id) döndürür."""
+    audio_root = os.path.join(input_folder, "audio")
+    audio_folders = [f for f in os.listdir(audio_root) if os.path.isdir(os.path.join(audio_root, f))]
+    if not audio_folders:
+        raise ValueError("Audio klasöründe video klasörü bulunamadı!")
+    return audio_folders[0]
+
+class Featurizer:
+    """Ses dosyalarını işleyip veri seti kayıtları üreten öznitelik çıkarıcı.
+
+    Tokenizer ilk ihtiyaç duyulduğunda bir kez yüklenir ve sonraki tüm
+    dosyalar için yeniden kullanılır. Mel spektrogram ve MFCC aynı STFT'den
+    türetilir (FeatureEngine). cache_dir verilirse dB mel, MFCC, görsel ve
+    token kimlikleri ses özeti ile ayarlara göre önbellekten okunur; ses
+    ancak bir öznitelik eksikse yüklenir.
+    """
+
+    def __init__(self, output_base=OUTPUT_BASE, tokenizer_name=TOKENIZER_NAME, spectrogram_mode="png",
+                 batch_size=DEFAULT_BATCH_SIZE, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+        if spectrogram_mode not in SPECTROGRAM_MODES:
+            raise ValueError(f"Bilinmeyen spektrogram kipi: {spectrogram_mode}")
+        self.output_base = output_base
+        self.json_output_folder = os.path.join(output_base, "json")
+        self.dataset_output_folder = os.path.join(output_base, "dataset")
+        self.spectrogram_output_folder = os.path.join(output_base, "spectrogram")
+        self.tokenizer_name = tokenizer_name
+        self.spectrogram_mode = spectrogram_mode
+        self.engine = FeatureEngine()
+        self.batch_size = batch_size
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.cache = FeatureCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self._tokenizer = None
+
+        # Çıkış klasörlerini oluştur
+        os.makedirs(self.json_output_folder, exist_ok=True)
+        os.makedirs(self.dataset_output_folder, exist_ok=True)
+        os.makedirs(self.spectrogram_output_folder, exist_ok=True)
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name, use_fast=True)
+        return self._tokenizer
+
+    def lookup(self, audio_path):
+        """Segmentin önbellek anahtarlarını ve önbellekteki dB mel/MFCC dizilerini döndürür.
+
+        Önbellek kapalıysa None döner. Anahtarlar ses dosyasının özetini
+        ve her özniteliğin bağlı olduğu ayarları içerir; örneğin n_mfcc
+        değişirse yalnızca MFCC anahtarı değişir.
+        """
+        if self.cache is None:
+            return None
+        engine = self.engine
+        # Ses özgün örnekleme hızında yüklendiğinden sr dosya özetiyle belirlenir
+        stft = (file_digest(audio_path), "native", engine.n_fft, engine.hop_length, engine.n_mels, engine.top_db)
+        keys = {
+            "mel_db": cache_key("mel_db", *stft),
+            "mfcc": cache_key("mfcc", *stft, engine.n_mfcc),
+            "image": cache_key("image", *stft, self.spectrogram_mode),
+        }
+        return {
+            "keys": keys,
+            "mel_db": self.cache.get_array("mel_db", keys["mel_db"]),
+            "mfcc": self.cache.get_array("mfcc", keys["mfcc"]),
+        }
+
+    def needs_audio(self, cached):
+        """Sesin yüklenip analiz edilmesi gerekiyorsa True döndürür."""
+        return cached is None or cached["mel_db"] is None or cached["mfcc"] is None
+
+    def resolve(self, cached, name, features):
+        """Özniteliği önbellekten alır; yoksa features'tan hesaplayıp önbelleğe yazar."""
+        if cached is None:
+            return getattr(features, name)
+        if cached[name] is None:
+            cached[name] = getattr(features, name).astype(np.float32)
+            self.cache.put_array(name, cached["keys"][name], cached[name])
+        return cached[name]
+
+    def tokenize_many(self, transcriptions):
+        """Metinleri tek bir toplu tokenizer çağrısıyla işler; {metin: (tokens, token_ids)} döndürür.
+
+        token_ids özel tokenlarla ([CLS], [SEP]) birlikte kodlanır; tokens
+        aynı kodlamadan convert_ids_to_tokens ile, eklenen özel tokenlar
+        çıkarılarak elde edilir. Böylece metin iki kez tokenize edilmez.
+        Önbellek açıksa sonuçlar tokenizer adı ve metne göre saklanır.
+        """
+        results = {}
+        missing = []
+        for transcription in dict.fromkeys(transcriptions):
+            if self.cache is not None:
+                cached = self.cache.get_json("tokens", cache_key("tokens", self.tokenizer_name, transcription))
+                if cached is not None:
+                    results[transcription] = (cached["tokens"], cached["token_ids"])
+                    continue
+            missing.append(transcription)
+
+        if missing:
+            encoding = self.tokenizer(
+                missing,
+                return_special_tokens_mask=True,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+            )
+            for transcription, token_ids, special in zip(missing, encoding["input_ids"], encoding["special_tokens_mask"]):
+                tokens = [
+                    token for token, is_special in zip(self.tokenizer.convert_ids_to_tokens(token_ids), special)
+                    if not is_special
+                ]
+                results[transcription] = (tokens, token_ids)
+                if self.cache is not None:
+                    key = cache_key("tokens", self.tokenizer_name, transcription)
+                    self.cache.put_json("tokens", key, {"tokens": tokens, "token_ids": token_ids})
+        return results
+
+    def spectrogram_basename(self, audio_path):
+        """Spektrogram çıktısı için uzantısız dosya adını belirler.
+
+        Ad klasör taranmadan segment kimliğinden türetilir; aynı segment her
+        çalıştırmada aynı adı alır ve eşzamanlı süreçler çakışmaz.
+        """
+        video_id, _ = segment_key(audio_path)
+        return f"{video_id}_{segment_file_name(audio_path)}"
+
+    def save_spectrogram(self, mel_db, audio_path, image_key=None):
+        """dB mel spektrogramı seçilen kipte kaydeder.
+
+        (spektrogram görselinin yolu, ham mel matrisinin yolu) döndürür;
+        kipe göre bunlardan biri None olur. image_key verilirse görsel
+        önbellekten kopyalanır ya da çizildikten sonra önbelleğe eklenir.
+        """
+        basename = self.spectrogram_basename(audio_path)
+
+        if self.spectrogram_mode == "none":
+            mel_path = os.path.join(self.spectrogram_output_folder, f"{basename}_mel.npy")
+            np.save(mel_path, mel_db.astype(np.float32))
+            return None, mel_path
+
+        spectrogram_path = os.path.join(self.spectrogram_output_folder, f"{basename}_spectrogram.png")
+        if image_key is not None:
+            image = self.cache.get("image", image_key)
+            if image is not None:
+                with open(spectrogram_path, "wb") as f:
+                    f.write(image)
+                return spectrogram_path, None
+            self.render_spectrogram(mel_db, spectrogram_path)
+            with open(spectrogram_path, "rb") as f:
+                self.cache.put("image", image_key, f.read())
+            return spectrogram_path, None
+
+        self.render_spectrogram(mel_db, spectrogram_path)
+        return spectrogram_path, None
+
+    def render_spectrogram(self, mel_db, spectrogram_path):
+        """dB mel spektrogramı seçilen kipte (png/matplotlib) görsel olarak çizer."""
+        if self.spectrogram_mode == "png":
+            save_mel_png(mel_db, spectrogram_path)
+            return
+
+        import librosa.display
+        import matplotlib.pyplot as plt
+
+        plt.figure(figsize=(10, 4))
+        librosa.display.specshow(mel_db, y_axis='mel', x_axis='time')
+        plt.colorbar(format='%+2.0f dB')
+        plt.title('Mel Spectrogram')
+        plt.savefig(spectrogram_path)
+        plt.close()
+
+    def load_audio(self, audio_path):
+        """Ses dosyasını özgün örnekleme hızında yükler; (y, sr) döndürür."""
+        import librosa
+        return librosa.load(audio_path, sr=None)
+
+    def build_record(self, audio_path, features, transcription=None, cached=None, tokenized=None):
+        """Hesaplanmış özniteliklerden spektrogramı kaydeder ve veri seti kaydını oluşturur.
+
+        cached, lookup'ın sonucudur; tüm öznitelikler önbellekteyse
+        features None olabilir. tokenized, tokenize_many'nin sonucudur;
+        metin içinde yoksa burada tokenize edilir.
+        """
+        file = os.path.basename(audio_path)
+        if transcription is None:
+            transcription = transcription_from_filename(file)
+
+        # Spektrogramı kaydet
+        mel_db = self.resolve(cached, "mel_db", features)
+        image_key = cached["keys"]["image"] if cached is not None else None
+        spectrogram_path, mel_path = self.save_spectrogram(mel_db, audio_path, image_key)
+
+        # MFCC özelliklerini çıkar
+        mfcc = self.resolve(cached, "mfcc", features)
+
+        # Metni tokenize et
+        if not tokenized or transcription not in tokenized:
+            tokenized = self.tokenize_many([transcription])
+        tokens, token_ids = tokenized[transcription]
+
+        record = {
+            "segment_id": segment_id(audio_path),
+            "audio_file": audio_path,
+            "transcription": transcription,
+            "spectrogram": spectrogram_path,
+            "mfcc": mfcc,
+            "tokens": tokens,
+            "token_ids": token_ids
+        }
+        if mel_path:
+            record["mel"] = mel_path
+        return record
+
+    def process_file(self, audio_path, transcription=None, tokenized=None):
+        """Tek bir ses dosyasını işler ve veri seti kaydını döndürür.
+
+        transcription verilmezse dosya adından çıkarılır.
+        """
+        cached = self.lookup(audio_path)
+        features = None
+        if self.needs_audio(cached):
+            y, sr = self.load_audio(audio_path)
+
+            # STFT bir kez hesaplanır; mel ve MFCC aynı güç spektrumundan türetilir
+            features = self.engine.analyze(y, sr)
+        return self.build_record(audio_path, features, transcription, cached, tokenized)
+
+    def analyze_loaded(self, loaded):
+        """{yol: (y, sr)} sözlüğündeki sinyalleri örnekleme hızına göre gruplayıp toplu analiz eder.
+
+        {yol: SegmentFeatures} döndürür.
+        """
+        by_rate = {}
+        for audio_path, (y, sr) in loaded.items():
+            by_rate.setdefault(sr, []).append(audio_path)
+
+        features = {}
+        for sr, paths in by_rate.items():
+            batch = self.engine.analyze_batch([loaded[path][0] for path in paths], sr, batch_size=max(1, self.batch_size))
+            features.update(zip(paths, batch))
+        return features
+
+    def process_segments(self, segments):
+        """Bellekteki (audio_path, y, sr, transcription) segmentlerini işler; (kayıtlar, hatalı yollar) döndürür.
+
+        Bölücünün birleşik kipinde kullanılır: PCM diskteki dosyadan yeniden
+        çözülmez ve metin dosya adından değil özgün altyazıdan gelir.
+        Özellikler kodlanmamış PCM'den hesaplandığından önbellek kullanılmaz.
+        """
+        tokenized = self.tokenize_many(transcription for _, _, _, transcription in segments)
+        features = self.analyze_loaded({audio_path: (y, sr) for audio_path, y, sr, _ in segments})
+
+        records = []
+        failed = []
+        for audio_path, _, _, transcription in segments:
+            try:
+                records.append(self.build_record(audio_path, features[audio_path], transcription, tokenized=tokenized))
+            except Exception as e:
+                print(f"Hata: {audio_path} işlenirken bir sorun oluştu. Hata mesajı: {e}")
+                failed.append(audio_path)
+        return records, failed
+
+    def process_batch(self, audio_paths, tokenized=None):
+        """Ses dosyalarını toplu işler; kayıtları giriş sırasıyla döndürür.
+
+        Dosyalar örnekleme hızına göre gruplanır ve her grup
+        FeatureEngine.analyze_batch ile benzer uzunluktaki dolgulu
+        yığınlar halinde işlenir. Öznitelikleri önbellekte olan dosyalar
+        yüklenmez. Yüklenemeyen ya da işlenemeyen dosyalar atlanır.
+        tokenized verilmezse tüm metinler tek çağrıda tokenize edilir.
+        """
+        if tokenized is None:
+            tokenized = self.tokenize_many(transcription_from_filename(os.path.basename(path)) for path in audio_paths)
+
+        cached = {}
+        loaded = {}
+        for audio_path in audio_paths:
+            try:
+                cached[audio_path] = self.lookup(audio_path)
+                if self.needs_audio(cached[audio_path]):
+                    loaded[audio_path] = self.load_audio(audio_path)
+            except Exception as e:
+                cached.pop(audio_path, None)
+                print(f"Hata: {audio_path} işlenirken bir sorun oluştu. Hata mesajı: {e}")
+
+        features = self.analyze_loaded(loaded)
+
+        records = []
+        for audio_path in audio_paths:
+            if audio_path not in cached or (audio_path not in features and self.needs_audio(cached[audio_path])):
+                continue
+            try:
+                records.append(self.build_record(
+                    audio_path, features.get(audio_path), cached=cached[audio_path], tokenized=tokenized
+                ))
+            except Exception as e:
+                print(f"Hata: {audio_path} işlenirken bir sorun oluştu. Hata mesajı: {e}")
+        return records
+
+    def iter_audio_files(self, input_folder=INPUT_FOLDER):
+        """Klasör ağacındaki ses dosyalarının yollarını üretir."""
+        for root, dirs, files in os.walk(input_folder):
+            for file in files:
+                if file.endswith(AUDIO_EXTENSIONS):
+                    yield os.path.join(root, file)
+
+    def process_paths(self, audio_paths, tokenized=None):
+        """Verilen dosyaları batch_size'a göre toplu ya da tek tek işler; hatalı dosyalar atlanır."""
+        if self.batch_size > 1:
+            return self.process_batch(audio_paths, tokenized)
+
+        records = []
+        for audio_path in audio_paths:
             try:
-                # Ses dosyasını yükle
-                y, sr = librosa.load(audio_path, sr=None)
-                
-                # Spektrogram oluştur
-                spectrogram = librosa.feature.melspectrogram(y=y, sr=sr)
-                
-                # Spektrogramı görselleştir ve kaydet
-                plt.figure(figsize=(10, 4))
-                librosa.display.specshow(librosa.power_to_db(spectrogram, ref=np.max), y_axis='mel', x_axis='time')
-                plt.colorbar(format='%+2.0f dB')
-                plt.title('Mel Spectrogram')
-                
-                # Mevcut spektrogram dosyalarını kontrol et ve bir sonraki sıradaki numarayı belirle
-                existing_spectrogram_files = [f for f in os.listdir(spectrogram_output_folder) if f.endswith("_spectrogram.png")]
-                next_file_number = len(existing_spectrogram_files) + 1
-                
-                # Dosya adındaki numarayı al
-                file_number = file.split("_")[0]
-                
-                # Spektrogram dosya ismini oluştur
-                spectrogram_filename = f"{next_file_number:07d}_{file_number}_{'_'.join(file.split('_')[1:])}_spectrogram.png"
-                spectrogram_path = os.path.join(spectrogram_output_folder, spectrogram_filename)
-                plt.savefig(spectrogram_path)
-                plt.close()
-                
-                # MFCC özelliklerini çıkar
-                mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-                
-                # Metni tokenize et
-                tokens = tokenizer.tokenize(transcription)
-                token_ids = tokenizer.encode(transcription)
-                
-                # Veri setine ekle
-                dataset.append({
-                    "audio_file": audio_path,
-                    "transcription": transcription,
-                    "spectrogram": spectrogram_path,
-                    "mfcc": mfcc.tolist(),  # Numpy array'i listeye çevir
-                    "tokens": tokens,
-                    "token_ids": token_ids
-                })
+                records.append(self.process_file(audio_path, tokenized=tokenized))
             except Exception as e:
                 print(f"Hata: {audio_path} işlenirken bir sorun oluştu. Hata mesajı: {e}")
+        return records
+
+    def options(self):
+        """Aynı ayarlarla başka bir süreçte Featurizer kurmak için gereken argümanlar."""
+        return {
+            "output_base": self.output_base,
+            "tokenizer_name": self.tokenizer_name,
+            "spectrogram_mode": self.spectrogram_mode,
+            "batch_size": self.batch_size,
+            "cache_dir": self.cache_dir,
+            "cache_max_bytes": self.cache_max_bytes,
+        }
+
+    def iter_records(self, input_folder=INPUT_FOLDER, workers=1):
+        """Klasör ağacındaki tüm ses dosyalarını işleyip kayıtları üretildikçe verir.
+
+        Dosyalar yol sırasına göre parçalara bölünür; batch_size 1'den
+        büyükse her parça toplu yolla işlenir. workers > 1 ise parçalar bir
+        süreç havuzuna dağıtılır ve sonuçlar yine parça sırasıyla toplanır,
+        böylece çıktı tek süreçli çalışmayla aynı sırada olur. Hatalı
+        dosyalar atlanır. Tüm metinler en başta tek bir toplu tokenizer
+        çağrısıyla işlenir; işçiler tokenizer yüklemez.
+        """
+        audio_paths = sorted(self.iter_audio_files(input_folder))
+        transcriptions = {path: transcription_from_filename(os.path.basename(path)) for path in audio_paths}
+        tokenized = self.tokenize_many(transcriptions.values()) if audio_paths else {}
+
+        def chunk_tokens(chunk):
+            return {transcriptions[path]: tokenized[transcriptions[path]] for path in chunk}
+
+        if workers <= 1:
+            window = max(1, self.batch_size) * LOAD_WINDOW
+            for i in range(0, len(audio_paths), window):
+                chunk = audio_paths[i:i + window]
+                yield from self.process_paths(chunk, chunk_tokens(chunk))
+            return
+
+        # Her işçiye küçük parçalar verilir ki yük dengeli dağılsın
+        window = max(1, self.batch_size)
+        chunks = [audio_paths[i:i + window] for i in range(0, len(audio_paths), window)]
+        yield from _map_chunks(chunks, workers, self.options(), chunk_tokens)
+
+    def iter_shard_records(self, shard_dir):
+        """Parça klasöründeki örnekleri sırayla okuyup kayıtları üretildikçe verir.
+
+        Ses baytları bellekte çözülür, metin örneğin .json üyesinden alınır;
+        kayıtların audio_file alanı parça başvurusudur (shard://klasör#üye).
+        """
+        import soundfile as sf
+
+        window = max(1, self.batch_size) * LOAD_WINDOW
+        segments = []
+        for key, members in iter_samples(shard_dir):
+            try:
+                metadata = json.loads(members.pop("json").decode("utf-8"))
+                extension, data = next(iter(members.items()))
+                y, sr = sf.read(io.BytesIO(data), dtype="float32")
+                if y.ndim > 1:
+                    y = y.mean(axis=1)
+                text = " ".join(metadata["text"].split())
+                segments.append((shard_ref(shard_dir, f"{key}.{extension}"), y, sr, text))
+            except Exception as e:
+                print(f"Hata: {shard_ref(shard_dir, key)} işlenirken bir sorun oluştu. Hata mesajı: {e}")
+                continue
+            if len(segments) >= window:
+                yield from self.process_segments(segments)[0]
+                segments = []
+        if segments:
+            yield from self.process_segments(segments)[0]
+
+    def process_dir(self, input_folder=INPUT_FOLDER, workers=1):
+        """Klasör ağacındaki tüm ses dosyalarını işleyip kayıt listesini döndürür."""
+        return list(self.iter_records(input_folder, workers))
+
+    def parquet_path(self, video_id):
+        return os.path.join(self.dataset_output_folder, f"{video_id}_processed_dataset.parquet")
+
+    def save_parquet(self, records, video_id, mfcc_dtype="float32"):
+        """Kayıtları akış halinde <video_id>_processed_dataset.parquet dosyasına yazar.
+
+        (dosya yolu, kayıt sayısı) döndürür.
+        """
+        from dataset_writer import RecordWriter
+
+        output_path = self.parquet_path(video_id)
+        with RecordWriter(output_path, mfcc_dtype=mfcc_dtype) as writer:
+            for record in records:
+                writer.write(record)
+        return output_path, writer.rows
+
+    def save_json(self, dataset, video_id):
+        """Veri setini <video_id>_processed_dataset.json olarak kaydeder ve yolunu döndürür."""
+        output_json_path = os.path.join(self.json_output_folder, f"{video_id}_processed_dataset.json")
+        dataset = [dict(record, mfcc=np.asarray(record["mfcc"]).tolist()) for record in dataset]
+        with open(output_json_path, "w", encoding="utf-8") as f:
+            json.dump(dataset, f, ensure_ascii=False, indent=4)
+        return output_json_path
+
+class SegmentSink:
+    """Bölücünün kestiği segmentleri toplayıp öznitelik çıkaran ve kayıtları Parquet'e yazan alıcı.
+
+    Segmentler batch_size * LOAD_WINDOW adetlik pencereler halinde
+    Featurizer.process_segments'e verilir; kayıtlar
+    <video_id>_processed_dataset.parquet dosyasına akış halinde eklenir.
+    Bir pencerenin ya da tek bir segmentin hatası bölmeyi durdurmaz;
+    segmentler failed listesine eklenir ve öznitelikleri sonradan processed_dataset.py ile üretilebilir.
+    """
+
+    def __init__(self, featurizer, video_id, mfcc_dtype="float32"):
+        from dataset_writer import RecordWriter
+
+        self.featurizer = featurizer
+        self.path = featurizer.parquet_path(video_id)
+        self.writer = RecordWriter(self.path, mfcc_dtype=mfcc_dtype)
+        self.window = max(1, featurizer.batch_size) * LOAD_WINDOW
+        self._pending = []
+        self.failed = []
+
+    def add(self, audio_path, samples, sample_rate, transcription):
+        """(frame, kanal) PCM segmentini ve özgün metnini kuyruğa ekler."""
+        y = samples.mean(axis=1) if samples.ndim > 1 else samples
+        self._pending.append((audio_path, y, sample_rate, " ".join(transcription.split())))
+        if len(self._pending) >= self.window:
+            self.flush()
+
+    def flush(self):
+        segments, self._pending = self._pending, []
+        if not segments:
+            return
+        try:
+            records, failed = self.featurizer.process_segments(segments)
+            for record in records:
+                self.writer.write(record)
+        except Exception as e:
+            names = [os.path.basename(segment[0]) for segment in segments]
+            print(f"Hata: {len(names)} segmentin öznitelikleri çıkarılamadı ({e}): {', '.join(names)}")
+            self.failed.extend(segment[0] for segment in segments)
+            return
+        self.failed.extend(failed)
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Havuz işçisindeki Featurizer; filtre bankaları işçi başına bir kez kurulur.
+# Tokenlar ana süreçte toplu hesaplanıp parçalarla birlikte gönderilir.
+_worker_featurizer = None
+
+def _init_worker(options):
+    global _worker_featurizer
+    _worker_featurizer = Featurizer(**options)
+
+def _process_chunk(audio_paths, tokenized):
+    return _worker_featurizer.process_paths(audio_paths, tokenized)
+
+def _collect_chunk(future, audio_paths):
+    """Parçanın sonucunu alır; parça hata verirse dosyaları atlanır, havuzun çökmesi çağırana iletilir."""
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        for audio_path in audio_paths:
+            print(f"Hata: {audio_path} işlenirken bir sorun oluştu. Hata mesajı: {e}")
+        return []
+
+def _map_chunks(chunks, workers, options, chunk_tokens):
+    """Parçaları süreç havuzunda işleyip kayıtları parça sırasıyla verir.
+
+    Bir işçi çökerse havuz yeniden kurulur ve bitmemiş parçalar tek tek
+    yeniden denenir; yalnızca havuzu tek başına çökerten parça atlanır.
+    """
+    # (parça, tek başına mı, hazır sonuç); çökmeden önce biten parçaların sonucu saklanır
+    todo = deque((chunk, False, None) for chunk in chunks)
+    max_pending = workers * 4
+    while todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as executor:
+            pending = deque()
+            try:
+                while todo or pending:
+                    while todo and len(pending) < max_pending and not any(alone for _, _, alone in pending):
+                        chunk, alone, records = todo[0]
+                        if alone and pending:
+                            break
+                        if records is None:
+                            future = executor.submit(_process_chunk, chunk, chunk_tokens(chunk))
+                        else:
+                            future = Future()
+                            future.set_result(records)
+                        todo.popleft()
+                        pending.append((future, chunk, alone))
+                    future, chunk, _ = pending[0]
+                    records = _collect_chunk(future, chunk)
+                    pending.popleft()
+                    yield from records
+            except BrokenProcessPool as e:
+                retry = []
+                for future, chunk, alone in pending:
+                    if alone:
+                        for audio_path in chunk:
+                            print(f"Hata: {audio_path} işlenirken işçi süreç çöktü, atlanıyor. Hata mesajı: {e}")
+                    elif future.done() and future.exception() is None:
+                        retry.append((chunk, False, future.result()))
+                    else:
+                        retry.append((chunk, True, None))
+                suspects = sum(1 for _, _, records in retry if records is None)
+                print(f"Uyarı: İşçi süreç çöktü; havuz yeniden kuruluyor, {suspects} parça tek tek yeniden denenecek.")
+                todo.extendleft(reversed(retry))
+
+def claim_shard_jobs(featurizer, shard_dirs):
+    """Parça klasörlerini işlemeden hemen önce kayıt defterinden talep ederek (video_id, kayıtlar) üretir.
+
+    Aynı klasörleri paylaşan süreçler her videoyu bir kez işler; zaten
+    işlenmiş ya da başka süreçte olan videolar atlanır.
+    """
+    for shard_dir in shard_dirs:
+        video_id = os.path.basename(shard_dir)
+        if not get_ledger().claim("featurized", video_id=video_id):
+            print(f"Atlanıyor: {video_id} zaten işlenmiş ya da başka bir süreçte işleniyor.")
+            continue
+        yield video_id, featurizer.iter_shard_records(shard_dir)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ses segmentlerinden öznitelik çıkarıp JSON veri seti oluşturur.")
+    parser.add_argument(
+        "--spectrogram", dest="spectrogram_mode", choices=SPECTROGRAM_MODES, default="png",
+        help="Spektrogram çıktı kipi (varsayılan: png)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help=f"Birlikte işlenecek benzer uzunluktaki segment sayısı; 1 dosya dosya işler (varsayılan: {DEFAULT_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--tokenizer", dest="tokenizer_name", default=TOKENIZER_NAME,
+        help=f"Hugging Face tokenizer adı; önbellek bu ada göre ayrılır (varsayılan: {TOKENIZER_NAME})"
+    )
+    parser.add_argument(
+        "--output-format", choices=OUTPUT_FORMATS, default="parquet",
+        help="Veri seti çıktı biçimi (varsayılan: parquet)"
+    )
+    parser.add_argument(
+        "--mfcc-dtype", choices=("float32", "float16"), default="float32",
+        help="Parquet çıktısında MFCC sütununun tipi (varsayılan: float32)"
+    )
+    parser.add_argument(
+        "--cache-dir", default=CACHE_DIR,
+        help=f"Öznitelik önbelleği klasörü (varsayılan: {CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--cache-size", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 2,
+        help="Önbelleğin MB cinsinden üst sınırı; aşılınca en eski girdiler silinir"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Önbelleği kullanmadan her şeyi yeniden hesapla"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Dosyaları işleyecek süreç sayısı (varsayılan: 1)"
+    )
+    parser.add_argument(
+        "--input", dest="input_storage", choices=("files", "shards"), default="files",
+        help="Giriş deposu: output/audio altındaki dosyalar ya da output/shards altındaki tar parçaları (varsayılan: files)"
+    )
+    parser.add_argument(
+        "--upload", action="store_true",
+        help="Biten veri setlerini sonraki videolar işlenirken arka planda Hugging Face'e yükle"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    featurizer = Featurizer(
+        tokenizer_name=args.tokenizer_name,
+        spectrogram_mode=args.spectrogram_mode,
+        batch_size=args.batch_size,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_max_bytes=int(args.cache_size * 1024 ** 2),
+    )
+
+    def save(records, video_id):
+        if args.output_format == "json":
+            dataset = list(records)
+            return featurizer.save_json(dataset, video_id), len(dataset)
+        return featurizer.save_parquet(records, video_id, mfcc_dtype=args.mfcc_dtype)
+
+    if args.input_storage == "shards":
+        # Her videonun parçaları ayrı bir veri seti dosyasına yazılır
+        shard_dirs = list(iter_shard_dirs(os.path.join(INPUT_FOLDER, "shards")))
+        if not shard_dirs:
+            raise ValueError("Shards klasöründe parça bulunamadı!")
+        jobs = claim_shard_jobs(featurizer, shard_dirs)
+    else:
+        jobs = [(find_video_id(INPUT_FOLDER), featurizer.iter_records(INPUT_FOLDER, workers=args.workers))]
+
+    uploader = None
+    if args.upload:
+        from upload_to_huggingface import BackgroundUploader
+        uploader = BackgroundUploader()
+
+    failed_uploads = []
+    try:
+        for video_id, records in jobs:
+            try:
+                output_path, count = save(records, video_id)
+            except Exception as e:
+                get_ledger().release(video_id, error=str(e))
+                raise
 
-# JSON dosyasını video_id ile kaydet
-output_json_filename = f"{video_id}_processed_dataset.json"
-output_json_path = os.path.join(json_output_folder, output_json_filename)
+            # Videonun öznitelik çıkarımı tamamlandı
+            get_ledger().mark(video_id, "featurized")
 
-# Veri setini JSON dosyası olarak kaydet
-with open(output_json_path, "w", encoding="utf-8") as f:
-    json.dump(dataset, f, ensure_ascii=False, indent=4)
+            print(f"Toplam {count} ses dosyası işlendi.")
+            print(f"Veri seti '{output_path}' olarak kaydedildi.")
+            if uploader is not None:
+                uploader.submit(output_path)
+    finally:
+        if uploader is not None:
+            # Kuyrukta kalan yüklemelerin bitmesini bekle
+            failed_uploads = uploader.close()
+    print(f"Spektrogramlar '{featurizer.spectrogram_output_folder}' klasörüne kaydedildi.")
+    if failed_uploads:
+        print(f"Hata: {len(failed_uploads)} veri seti yüklenemedi, sonraki çalıştırmada yüklenecek: {', '.join(failed_uploads)}")
+        sys.exit(1)
 
-print(f"Toplam {len(dataset)} ses dosyası işlendi.")
-print(f"Spektrogramlar '{spectrogram_output_folder}' klasörüne kaydedildi.")
-print(f"JSON dosyası '{output_json_path}' olarak kaydedildi.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -19,10 +19,15 @@ def run_output_json():
         sys.exit(1)
 
 def run_processed_dataset():
-    """processed_dataset.py programını çalıştırır."""
+    """processed_dataset.py işlevini yeni bir süreç açmadan aynı süreçte çalıştırır.
+
+    Veri setleri işlenirken arka planda yüklenir; sonraki yükleme adımı
+    yalnızca kalanları gönderip output klasörünü temizler.
+    """
     try:
-        subprocess.run([sys.executable, "processed_dataset.py"], check=True)
-    except subprocess.CalledProcessError as e:
+        import processed_dataset
+        processed_dataset.main(["--upload"])
+    except Exception as e:
         print(f"Hata: processed_dataset.py çalıştırılırken bir sorun oluştu. Hata mesajı: {e}")
         sys.exit(1)
 
@@ -38,6 +43,7 @@ def main(youtube_url):
     # Klasörleri oluştur
     os.makedirs("output/audio", exist_ok=True)
     os.makedirs("output/json", exist_ok=True)
+    os.makedirs("output/dataset", exist_ok=True)
     os.makedirs("output/spectrogram", exist_ok=True)
     
     try:
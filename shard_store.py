@@ -0,0 +1,145 @@
+"""Segmentleri tek tek dosyalar yerine boyut sınırlı tar parçalarında (shard) saklar.
+
+Her video için output/shards/<video_id>/ altında WebDataset düzeninde
+<video_id>-00000.tar, <video_id>-00001.tar, ... dosyaları oluşturulur.
+Bir örneğin üyeleri aynı anahtarı paylaşır: "003.mp3" (ses) ve
+"003.json" (id, metin, başlangıç/bitiş, video kimliği). Üyeler parçanın
+sonuna sırayla eklenir; parça boyut sınırını aşacaksa yenisine geçilir.
+
+index.jsonl her örnek için hangi parçada, hangi bayt aralığında
+bulunduğunu tutar; böylece tek bir üye, parçayı baştan okumadan
+okunabilir. Bir örneğe "shard://<parça klasörü>#<üye adı>" biçimindeki
+başvuruyla (ör. shard://output/shards/abc#003.mp3) erişilir; önek
+sayesinde adında "#" geçen sıradan dosyalar başvuru sanılmaz.
+"""
+import io
+import json
+import os
+import tarfile
+import time
+
+# Varsayılan parça boyutu sınırı (bayt)
+SHARD_MAX_BYTES = 256 * 1024 ** 2
+INDEX_FILE = "index.jsonl"
+SHARD_REF_PREFIX = "shard://"
+
+def shard_ref(directory, member):
+    """Parça klasöründeki bir üyeye başvuru oluşturur."""
+    return f"{SHARD_REF_PREFIX}{directory}#{member}"
+
+def is_shard_ref(path):
+    return path.startswith(SHARD_REF_PREFIX)
+
+def split_shard_ref(ref):
+    """"shard://<klasör>#<üye>" başvurusunu (klasör, üye) ikilisine ayırır."""
+    directory, _, member = ref[len(SHARD_REF_PREFIX):].rpartition("#")
+    return directory, member
+
+class ShardWriter:
+    """Örnekleri boyut sınırlı tar parçalarına sırayla ekleyen yazıcı."""
+
+    def __init__(self, directory, prefix, max_bytes=SHARD_MAX_BYTES):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.samples = 0
+        os.makedirs(directory, exist_ok=True)
+        self._shard_number = -1
+        self._tar = None
+        self._shard_name = None
+        self._index = open(os.path.join(directory, INDEX_FILE), "w", encoding="utf-8")
+
+    def _open_next(self):
+        if self._tar is not None:
+            self._tar.close()
+        self._shard_number += 1
+        self._shard_name = f"{self.prefix}-{self._shard_number:05d}.tar"
+        self._tar = tarfile.open(os.path.join(self.directory, self._shard_name), "w", format=tarfile.USTAR_FORMAT)
+
+    def add(self, key, members):
+        """members: {uzantı: bayt}. Örneğin tüm üyeleri aynı parçaya yazılır."""
+        # Her üye için 512 baytlık başlık ve 512'ye tamamlanan veri
+        size = sum(512 + -(-len(data) // 512) * 512 for data in members.values())
+        if self._tar is None or (self._tar.offset > 0 and self._tar.offset + size > self.max_bytes):
+            self._open_next()
+
+        entry = {"key": key, "shard": self._shard_name, "members": {}}
+        for extension, data in members.items():
+            info = tarfile.TarInfo(f"{key}.{extension}")
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._tar.addfile(info, io.BytesIO(data))
+            # addfile sonrası offset, verinin 512'ye tamamlanmış sonunu gösterir
+            data_offset = self._tar.offset - -(-len(data) // 512) * 512
+            entry["members"][extension] = [data_offset, len(data)]
+
+        self._index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.samples += 1
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ShardIndex:
+    """Bir parça klasörünün dizini; üyeleri bayt aralığından doğrudan okur."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = []
+        self._members = {}
+        with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                self.entries.append(entry)
+                for extension, (offset, size) in entry["members"].items():
+                    self._members[f"{entry['key']}.{extension}"] = (entry["shard"], offset, size)
+
+    def __contains__(self, member):
+        return member in self._members
+
+    def size(self, member):
+        return self._members[member][2]
+
+    def read(self, member):
+        shard, offset, size = self._members[member]
+        with open(os.path.join(self.directory, shard), "rb") as f:
+            f.seek(offset)
+            return f.read(size)
+
+def iter_samples(directory):
+    """Klasördeki örnekleri parça sırasıyla, her parçayı baştan sona tek geçişte okuyarak üretir.
+
+    (anahtar, {uzantı: bayt}) döndürür; üyeler anahtara göre gruplanır.
+    """
+    index = ShardIndex(directory)
+    shards = list(dict.fromkeys(entry["shard"] for entry in index.entries))
+    for shard in shards:
+        key, members = None, {}
+        with tarfile.open(os.path.join(directory, shard), "r|") as tar:
+            for info in tar:
+                if not info.isfile():
+                    continue
+                member_key, _, extension = info.name.partition(".")
+                if member_key != key and members:
+                    yield key, members
+                    members = {}
+                key = member_key
+                members[extension] = tar.extractfile(info).read()
+        if members:
+            yield key, members
+
+def iter_shard_dirs(root):
+    """root altındaki dizini olan parça klasörlerini ad sırasıyla üretir."""
+    if not os.path.isdir(root):
+        return
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        if os.path.isfile(os.path.join(directory, INDEX_FILE)):
+            yield directory
@@ -0,0 +1,60 @@
+"""Matplotlib kullanmadan dB mel spektrogramından PNG görsel üretir.
+
+dB matrisi bir renk tablosu (LUT) üzerinden doğrudan RGB dizisine çevrilir
+ve standart kütüphanedeki zlib ile PNG olarak yazılır. Her piksel bir mel
+bandına ve bir zaman çerçevesine karşılık gelir; düşük frekanslar altta
+kalır (librosa.display.specshow ile aynı yön).
+"""
+import struct
+import zlib
+
+import numpy as np
+
+# specshow'un 0 dB'e göre ölçeklenmiş veride kullandığı "magma" renk haritasının
+# eşit aralıklı 9 kontrol noktası
+_MAGMA_STOPS = [
+    "000004", "1d1147", "51127c", "822681", "b63679",
+    "e65164", "fb8861", "fec287", "fcfdbf",
+]
+
+def _build_lut(stops, size=256):
+    colors = np.array([[int(stop[i:i + 2], 16) for i in (0, 2, 4)] for stop in stops], dtype=np.float64)
+    positions = np.linspace(0.0, 1.0, len(stops))
+    samples = np.linspace(0.0, 1.0, size)
+    return np.stack([np.interp(samples, positions, colors[:, c]) for c in range(3)], axis=1).round().astype(np.uint8)
+
+MAGMA_LUT = _build_lut(_MAGMA_STOPS)
+
+def mel_to_rgb(mel_db, top_db=80.0, lut=MAGMA_LUT):
+    """dB mel matrisini (n_mels, frames) üst satırda yüksek frekans olacak şekilde RGB dizisine çevirir."""
+    mel_db = np.asarray(mel_db, dtype=np.float32)
+    peak = float(mel_db.max()) if mel_db.size else 0.0
+    scaled = (np.clip(mel_db, peak - top_db, peak) - (peak - top_db)) / top_db
+    indices = (scaled * (len(lut) - 1)).astype(np.intp)
+    return lut[indices[::-1]]
+
+def encode_png(rgb):
+    """(yükseklik, genişlik, 3) uint8 diziyi PNG baytlarına çevirir."""
+    rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+    height, width = rgb.shape[:2]
+
+    # Her satırın başına "filtre yok" (0) baytı eklenir
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", header),
+        chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ])
+
+def save_mel_png(mel_db, path, top_db=80.0):
+    """dB mel matrisini PNG olarak kaydeder."""
+    with open(path, "wb") as f:
+        f.write(encode_png(mel_to_rgb(mel_db, top_db)))
@@ -0,0 +1,254 @@
+import html
+import re
+
+import numpy as np
+
+# "HH:MM:SS.mmm --> HH:MM:SS.mmm" ya da saatsiz "MM:SS.mmm" zaman satırı
+_TIMING_RE = re.compile(
+    r'^\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s+-->\s+((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})'
+)
+# Satır içi zaman etiketleri (<00:00:01.000>) ve <c>, <i>, <v ...> gibi biçim etiketleri
+_TAG_RE = re.compile(r'<[^>]*>')
+# Köşeli parantez içindeki açıklamalar ([Müzik], [Alkış]) her zaman konuşma dışıdır
+_BRACKET_RE = re.compile(r'\[[^\]]*\]')
+# Normal parantezler şarkı sözü de içerebilir; yalnızca bilinen açıklamalar atılır
+_PAREN_RE = re.compile(r'\(([^)]*)\)')
+_MUSIC_SYMBOLS = '♪♫♬♩🎵🎶'
+SOUND_ANNOTATIONS = {
+    'müzik', 'muzik', 'music', 'alkış', 'alkis', 'applause', 'gülüşmeler', 'gülme', 'kahkaha',
+    'laughter', 'laughs', 'sessizlik', 'silence', 'şarkı', 'song', 'ses', 'noise', 'gürültü',
+}
+
+def parse_timestamp(value):
+    """HH:MM:SS.mmm veya MM:SS.mmm zamanını tamsayı milisaniyeye çevirir."""
+    parts = value.strip().replace(',', '.').split(':')
+    seconds, _, millis = parts[-1].partition('.')
+    total = int(parts[-2]) * 60 + int(seconds)
+    if len(parts) == 3:
+        total += int(parts[0]) * 3600
+    return total * 1000 + int(millis.ljust(3, '0')[:3] or 0)
+
+def clean_cue_line(line):
+    """Altyazı satırındaki etiketleri ve HTML varlıklarını temizler."""
+    line = html.unescape(_TAG_RE.sub('', line))
+    return ' '.join(line.split())
+
+def iter_raw_cues(lines):
+    """Satır akışından (start_ms, end_ms, [satırlar]) üçlülerini üretir.
+
+    Başlık, NOTE/STYLE/REGION blokları ve cue kimlikleri atlanır; dosya
+    hiçbir zaman bütünüyle belleğe alınmaz.
+    """
+    start = end = None
+    text_lines = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        match = _TIMING_RE.match(line)
+        if match:
+            if start is not None:
+                yield start, end, text_lines
+            start = parse_timestamp(match.group(1))
+            end = parse_timestamp(match.group(2))
+            text_lines = []
+        elif not line:
+            # Boş satır cue'yu bitirir (yalnızca boşluk içeren satır bitirmez)
+            if start is not None:
+                yield start, end, text_lines
+            start = None
+            text_lines = []
+        elif start is not None:
+            text_lines.append(line)
+    if start is not None:
+        yield start, end, text_lines
+
+def _repeated_prefix(lines, previous_lines):
+    """lines'ın başında, önceki cue'nun sonundaki satırlarla örtüşen satır sayısı."""
+    for k in range(min(len(lines), len(previous_lines)), 0, -1):
+        if lines[:k] == previous_lines[-k:]:
+            return k
+    return 0
+
+class Cues:
+    """Tamsayı başlangıç/bitiş dizileri ve metinlerden oluşan cue listesi."""
+
+    def __init__(self, starts, ends, texts, duplicates=0):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.texts = list(texts)
+        # Birleştirilen/atılan tekrar cue sayısı
+        self.duplicates = duplicates
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        return zip(self.starts.tolist(), self.ends.tolist(), self.texts)
+
+    @property
+    def durations(self):
+        return self.ends - self.starts
+
+    def select(self, mask):
+        """mask'ın True olduğu cue'lardan yeni bir Cues döndürür."""
+        mask = np.asarray(mask, dtype=bool)
+        texts = [text for text, keep in zip(self.texts, mask.tolist()) if keep]
+        return Cues(self.starts[mask], self.ends[mask], texts, self.duplicates)
+
+def collapse_cues(raw_cues):
+    """Kayan (rolling) ve tekrarlanan cue'ları tekil aralıklara indirger.
+
+    YouTube otomatik altyazılarında her cue, bir önceki cue'nun son
+    satırını tekrar gösterir ve ardından kısa "anlık görüntü" cue'ları
+    gelir. Bitişik önceki cue'dan taşınan satırlar atılır; tamamen tekrar
+    eden bir cue öncekiyle zaman olarak çakışıyorsa onun aralığına katılır,
+    aksi halde atılır. Aynı satırın kelime kelime büyüdüğü cue'lar tek
+    aralıkta birleştirilir.
+    """
+    starts, ends, texts = [], [], []
+    previous_lines = []
+    previous_end = None
+    duplicates = 0
+
+    for start, end, lines in raw_cues:
+        lines = [cleaned for cleaned in map(clean_cue_line, lines) if cleaned]
+        if not lines or end <= start:
+            continue
+
+        # Taşınan satırlar yalnızca bitişik cue'larda aranır; aradan
+        # sessizlik geçtiyse aynı metin gerçek bir tekrardır
+        new_lines = lines
+        if previous_end is not None and start <= previous_end:
+            new_lines = lines[_repeated_prefix(lines, previous_lines):]
+        previous_lines = lines
+        previous_end = end
+
+        if not new_lines:
+            duplicates += 1
+            if texts and start < ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            continue
+
+        text = '\n'.join(new_lines)
+        if texts and start <= ends[-1]:
+            last = texts[-1]
+            if text == last:
+                duplicates += 1
+                if start < ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                continue
+            if text.startswith(last):
+                # Satır kelime kelime büyüyor: aynı aralığı genişlet
+                duplicates += 1
+                texts[-1] = text
+                ends[-1] = max(ends[-1], end)
+                continue
+
+        starts.append(start)
+        ends.append(end)
+        texts.append(text)
+
+    return Cues(starts, ends, texts, duplicates)
+
+def read_vtt(subtitle_file):
+    """.vtt dosyasını akış halinde okuyup tekilleştirilmiş Cues döndürür."""
+    with open(subtitle_file, 'r', encoding='utf-8-sig') as f:
+        return collapse_cues(iter_raw_cues(f))
+
+def _split_long_cue(start, end, text, max_ms):
+    """max_ms'den uzun bir cue'yu eşit parçalara böler, kelimeleri oranla dağıtır.
+
+    Her parçaya en az bir kelime düşer; kelime sayısı yetmezse parçalar
+    max_ms'den uzun olur ama [start, end] aralığının tamamı kapsanır.
+    """
+    words = text.split()
+    parts = min(-(-(end - start) // max_ms), len(words))
+    if parts <= 1:
+        yield start, end, text
+        return
+    bounds = np.linspace(start, end, parts + 1).round().astype(np.int64).tolist()
+    word_groups = np.array_split(np.arange(len(words)), parts)
+    for k, group in enumerate(word_groups):
+        if len(group):
+            yield bounds[k], bounds[k + 1], ' '.join(words[group[0]:group[-1] + 1])
+
+def pack_cues(cues, max_ms=15000, max_gap_ms=500):
+    """Bitişik cue'ları hedef süre aralığındaki ifadelere (utterance) paketler.
+
+    Aralarındaki boşluk max_gap_ms'yi aşmayan cue'lar, birleşik süre
+    max_ms'yi geçmediği sürece tek parçada toplanır ve metinleri art arda
+    eklenir. max_ms'den uzun cue'lar önce eşit parçalara bölünür. En kısa
+    süre filtresi paketlemeden sonra çağıran tarafından uygulanır.
+    """
+    starts, ends, texts = [], [], []
+    for start, end, text in cues:
+        text = ' '.join(text.split())
+
+        # Önceki parçayla çakışan cue onun bitişinden başlatılır; tamamen
+        # içinde kalıyorsa metni önceki parçaya eklenir, böylece sıra korunur
+        if texts and start < ends[-1]:
+            if end <= ends[-1]:
+                texts[-1] = f"{texts[-1]} {text}"
+                continue
+            start = ends[-1]
+
+        pieces = [(start, end, text)] if end - start <= max_ms else _split_long_cue(start, end, text, max_ms)
+        for start, end, text in pieces:
+            if texts:
+                gap = start - ends[-1]
+                merged_end = max(end, ends[-1])
+                if gap <= max_gap_ms and merged_end - starts[-1] <= max_ms:
+                    ends[-1] = merged_end
+                    texts[-1] = f"{texts[-1]} {text}"
+                    continue
+            starts.append(start)
+            ends.append(end)
+            texts.append(text)
+
+    return Cues(starts, ends, texts, cues.duplicates)
+
+def is_non_speech_text(text):
+    """Metin yalnızca müzik işaretleri ya da ses açıklamalarından oluşuyorsa True döndürür."""
+    text = _BRACKET_RE.sub(' ', text)
+    text = _PAREN_RE.sub(
+        lambda match: ' ' if match.group(1).strip().lower() in SOUND_ANNOTATIONS else match.group(0),
+        text,
+    )
+    return not any(char.isalnum() for char in text if char not in _MUSIC_SYMBOLS)
+
+def speech_mask(cues):
+    """Konuşma içeren cue'lar için True olan boolean dizi döndürür."""
+    return np.fromiter((not is_non_speech_text(text) for text in cues.texts), dtype=bool, count=len(cues))
+
+def covered_ms(starts, ends):
+    """Aralıkların birleşiminin toplam süresini (çakışmalar bir kez sayılarak) döndürür."""
+    if len(starts) == 0:
+        return 0
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    effective_starts = np.maximum(starts, np.concatenate(([starts[0]], reach[:-1])))
+    return int(np.clip(ends - effective_starts, 0, None).sum())
+
+def subtitle_gate(cues, duration_ms=None, min_cues=10, min_speech_cues=5, min_coverage=0.2):
+    """Altyazının ses indirmeye değip değmediğine karar verir.
+
+    Toplam cue sayısı, konuşma (müzik/açıklama olmayan) cue sayısı ve
+    konuşma cue'larının videonun ne kadarını kapladığı eşiklerle
+    karşılaştırılır. duration_ms bilinmiyorsa son cue'nun bitişi kullanılır.
+    (geçti_mi, istatistikler) döndürür.
+    """
+    speech = speech_mask(cues)
+    if not duration_ms:
+        duration_ms = int(cues.ends.max()) if len(cues) else 0
+    coverage = covered_ms(cues.starts[speech], cues.ends[speech]) / duration_ms if duration_ms else 0.0
+    stats = {
+        'cues': len(cues),
+        'speech_cues': int(speech.sum()),
+        'coverage': round(coverage, 3),
+    }
+    passed = (
+        stats['cues'] >= min_cues
+        and stats['speech_cues'] >= min_speech_cues
+        and coverage >= min_coverage
+    )
+    return passed, stats
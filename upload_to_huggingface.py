@@ -1,138 +1,549 @@
+import argparse
+import functools
 import os
 import json
+import queue
+import random
 import shutil
-from datasets import Dataset, Audio, Image, concatenate_datasets, load_dataset
-from huggingface_hub import HfApi
+import threading
+import time
+import uuid
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datasets import Array2D, Audio, Features, Image, Sequence, Value
+from huggingface_hub import CommitOperationAdd, HfApi
 from dotenv import load_dotenv
+from dataset_writer import SHARD_ROW_GROUP_ROWS, SHARD_TARGET_BYTES, ShardedParquetWriter, matrix_column, matrix_rows
+from feature_engine import N_MELS, N_MFCC
+from pipeline_ledger import get_ledger
+from shard_store import ShardIndex, is_shard_ref, split_shard_ref
 
-def get_next_file_number():
-    # uploaded_to_huggingface.txt'den son numarayı al
-    if os.path.exists('uploaded_to_huggingface.txt'):
-        with open('uploaded_to_huggingface.txt', 'r', encoding='utf-8') as f:
-            uploaded_files = f.read().splitlines()
-            if uploaded_files:
-                # Son yüklenen dosyanın numarasını bul
-                last_file = uploaded_files[-1]
-                try:
-                    # Dosya adından numarayı çıkar (0000001_processed_dataset.json)
-                    last_number = int(os.path.basename(last_file).split('_')[0])
-                    return last_number + 1
-                except (ValueError, IndexError):
-                    pass
-    return 1
-
-def upload_to_huggingface(json_path,  video_id=None):
-    load_dotenv()
-    hf_token = os.getenv('HUGGINGFACE_TOKEN')
-    
-    # Repository adını doğrudan belirle
-    repo_name = "sadece/sayha"  # Sabit repository adı
-    
-    if not repo_name:
-        raise ValueError("Repository adı belirtilmemiş")
-        
-    if not hf_token:
-        raise ValueError("HUGGINGFACE_TOKEN bulunamadı. Lütfen .env dosyasını kontrol edin.")
-    
-    print(f"Kullanılan repository: {repo_name}")
-    
-    try:
-        # Repository'yi kontrol et veya oluştur
-        api = HfApi()
-        try:
-            api.repo_exists(repo_id=repo_name, repo_type="dataset")
-            print(f"Repository bulundu: {repo_name}")
-        except Exception as e:
-            print(f"Repository oluşturuluyor: {repo_name}")
-            api.create_repo(repo_id=repo_name, repo_type="dataset", private=False)
-            print(f"Yeni repository oluşturuldu: {repo_name}")
+# mfcc ve mel tensör sütunlarının tipi (float16 ya da float32). Aynı
+# repository'deki tüm parçalar aynı tipte olmalıdır.
+TENSOR_DTYPE = 'float16'
 
-        # JSON dosyasını oku
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+# Hugging Face veri setinin sütunları; parçalar bu şemayla (özellik
+# metadatası dahil) yazıldığından Audio/Image sütunları doğrudan tanınır.
+# mfcc ve mel (çerçeve, katsayı) biçimli Array2D sütunlarıdır: yalnızca
+# ilk boyut (çerçeve sayısı) değişkendir, şekil ve tip metadatada saklanır
+# ve satırlar numpy dizisi olarak çözülür. mel yalnızca ham mel matrisi
+# kaydedildiyse (processed_dataset.py --spectrogram none) doludur.
+UPLOAD_FEATURES = Features({
+    'id': Value('string'),
+    'audio': Audio(),
+    'transcription': Value('string'),
+    'spectrogram': Image(),
+    'mfcc': Array2D(shape=(None, N_MFCC), dtype=TENSOR_DTYPE),
+    'mel': Array2D(shape=(None, N_MELS), dtype=TENSOR_DTYPE),
+    'tokens': Sequence(Value('string')),
+    'token_ids': Sequence(Value('int32')),
+})
+
+# Parquet'te BYTE_STREAM_SPLIT kodlamasıyla yazılan tensör sütunları
+TENSOR_COLUMNS = ('mfcc', 'mel')
 
-        # Yeni veriyi Hugging Face formatına dönüştür
-        new_dataset_dict = {
-            'id': [],
-            'audio': [],
-            'transcription': [],
-            'spectrogram': [],
-            'mfcc': [],
-            'tokens': [],
-            'token_ids': []
-        }
+# processed_dataset kayıt alanı -> Hugging Face sütunu
+UPLOAD_COLUMNS = {
+    'segment_id': 'id',
+    'audio_file': 'audio',
+    'transcription': 'transcription',
+    'spectrogram': 'spectrogram',
+    'mfcc': 'mfcc',
+    'mel': 'mel',
+    'tokens': 'tokens',
+    'token_ids': 'token_ids',
+}
 
+def read_dataset_table(dataset_path, video_id=None):
+    """İşlenmiş veri setini (Parquet ya da eski JSON) yükleme sütunlarıyla Arrow tablosu olarak okur.
+
+    Ses dosyası ya da spektrogram görseli diskte bulunmayan satırlar atlanır.
+    """
+    if dataset_path.endswith('.parquet'):
+        table = pq.read_table(dataset_path)
+    else:
+        with open(dataset_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # Eski JSON kayıtlarında segment_id yoktu
         for idx, item in enumerate(data):
-            if not os.path.exists(item['audio_file']) or not os.path.exists(item['spectrogram']):
-                print(f"Uyarı: Dosya bulunamadı, bu örnek atlanıyor: {item['audio_file']}")
+            item.setdefault('segment_id', f"{video_id}_{idx:03d}")
+            item.setdefault('spectrogram', None)
+            item.setdefault('mel', None)
+        table = pa.Table.from_pylist(data)
+
+    audio_files = table.column('audio_file').to_pylist()
+    spectrograms = table.column('spectrogram').to_pylist()
+    shard_indexes = {}
+    keep = []
+    for audio_file, spectrogram in zip(audio_files, spectrograms):
+        # Spektrogram görseli isteğe bağlıdır (processed_dataset.py --spectrogram none)
+        exists = audio_exists(audio_file, shard_indexes) and (not spectrogram or os.path.exists(spectrogram))
+        if not exists:
+            print(f"Uyarı: Dosya bulunamadı, bu örnek atlanıyor: {audio_file}")
+        keep.append(exists)
+
+    table = table.filter(pa.array(keep, type=pa.bool_())).select(list(UPLOAD_COLUMNS))
+    return table.rename_columns(list(UPLOAD_COLUMNS.values()))
+
+def shard_index(directory, shard_indexes):
+    """Parça klasörünün ShardIndex'ini shard_indexes sözlüğünden döndürür; yoksa açıp ekler."""
+    if directory not in shard_indexes:
+        shard_indexes[directory] = ShardIndex(directory)
+    return shard_indexes[directory]
+
+def audio_exists(audio_file, shard_indexes):
+    """Ses dosyası ya da parça başvurusu (shard://klasör#üye) mevcutsa True döndürür."""
+    if not is_shard_ref(audio_file):
+        return os.path.exists(audio_file)
+    directory, member = split_shard_ref(audio_file)
+    try:
+        return member in shard_index(directory, shard_indexes)
+    except FileNotFoundError:
+        return False
+
+def read_media(path, shard_indexes):
+    """Dosyanın ya da parça üyesinin baytlarını {bytes, path} olarak döndürür; path None ise None."""
+    if not path:
+        return None
+    if is_shard_ref(path):
+        directory, member = split_shard_ref(path)
+        return {'bytes': shard_index(directory, shard_indexes).read(member), 'path': member}
+    with open(path, 'rb') as f:
+        return {'bytes': f.read(), 'path': os.path.basename(path)}
+
+def embed_media(table, shard_indexes):
+    """audio ve spectrogram yol sütunlarını gömülü bayt içeren {bytes, path} sütunlarına çevirir."""
+    for name in ('audio', 'spectrogram'):
+        column = pa.array(
+            [read_media(path, shard_indexes) for path in table.column(name).to_pylist()],
+            type=pa.struct([('bytes', pa.binary()), ('path', pa.string())]),
+        )
+        table = table.set_column(table.schema.get_field_index(name), name, column)
+    return table
+
+def tensor_column(matrices, arrow_type):
+    """(çerçeve, katsayı) matrislerini arrow_type tipinde (Array2D) bir sütuna çevirir; None satırlar boş kalır."""
+    storage_type = arrow_type.storage_type if isinstance(arrow_type, pa.ExtensionType) else arrow_type
+    value_type = storage_type.value_type.value_type
+    np_dtype = value_type.to_pandas_dtype()
+    width = getattr(arrow_type, 'shape', (None, None))[-1]
+
+    present = []
+    indices = []
+    for matrix in matrices:
+        if matrix is None:
+            indices.append(None)
+            continue
+        if width is not None and matrix.shape[1] != width:
+            raise ValueError(f"Beklenen {width} sütun yerine {matrix.shape[1]} sütunlu matris")
+        indices.append(len(present))
+        present.append(matrix)
+
+    column = matrix_column(present, np_dtype, value_type)
+    if len(present) < len(indices):
+        column = column.take(pa.array(indices, type=pa.int32()))
+    if isinstance(arrow_type, pa.ExtensionType):
+        column = pa.ExtensionArray.from_storage(arrow_type, column)
+    return column
+
+def load_mel(mel_path):
+    """Kaydedilmiş (mel bandı, çerçeve) dB mel matrisini (çerçeve, bant) olarak yükler; yoksa None."""
+    if not mel_path or not os.path.exists(mel_path):
+        return None
+    return np.load(mel_path).T
+
+def embed_tensors(table):
+    """mfcc (katsayı, çerçeve) listelerini ve mel .npy yollarını (çerçeve, katsayı) Array2D sütunlarına çevirir."""
+    schema = UPLOAD_FEATURES.arrow_schema
+    columns = {
+        'mfcc': [None if matrix is None else matrix.T for matrix in matrix_rows(table.column('mfcc'))],
+        'mel': [load_mel(path) for path in table.column('mel').to_pylist()],
+    }
+    for name, matrices in columns.items():
+        column = tensor_column(matrices, schema.field(name).type)
+        table = table.set_column(table.schema.get_field_index(name), name, column)
+    return table
+
+def write_upload_shards(dataset_paths, output_dir, start_number=0, max_bytes=SHARD_TARGET_BYTES, max_rows=None):
+    """Birden fazla videonun satırlarını hedef boyutlu Parquet parçalarına akış halinde yazar.
+
+    Ses ve spektrogram baytları satırlara gömülür, mfcc ve mel tipli
+    tensör sütunlarına çevrilir; bellekte aynı anda en
+    fazla bir satır grubu kadar gömülü veri tutulur. Okunamayan veri seti
+    dosyaları atlanır. (parça yolları, yazılan veri seti yolları) döndürür.
+    """
+    writer = ShardedParquetWriter(
+        output_dir, UPLOAD_FEATURES.arrow_schema, start_number=start_number, max_bytes=max_bytes, max_rows=max_rows,
+        byte_stream_split=TENSOR_COLUMNS,
+    )
+    written = []
+    try:
+        for dataset_path in dataset_paths:
+            video_id = get_video_id_from_filename(os.path.basename(dataset_path))
+            try:
+                table = read_dataset_table(dataset_path, video_id)
+            except Exception as e:
+                print(f"Hata: {dataset_path} okunamadı, atlanıyor: {e}")
                 continue
+            shard_indexes = {}
+            for offset in range(0, table.num_rows, SHARD_ROW_GROUP_ROWS):
+                rows = table.slice(offset, SHARD_ROW_GROUP_ROWS)
+                writer.write(embed_tensors(embed_media(rows, shard_indexes)))
+            written.append(dataset_path)
+            print(f"{table.num_rows} satır eklendi: {dataset_path}")
+        return writer.close(), written
+    except BaseException:
+        writer.abort()
+        raise
 
-            new_dataset_dict['id'].append(f"{video_id}_{idx:03d}")
-            new_dataset_dict['audio'].append(item['audio_file'])
-            new_dataset_dict['transcription'].append(item['transcription'])
-            new_dataset_dict['spectrogram'].append(item['spectrogram'])
-            new_dataset_dict['mfcc'].append(item['mfcc'])
-            new_dataset_dict['tokens'].append(item['tokens'])
-            new_dataset_dict['token_ids'].append(item['token_ids'])
+# Varsayılan repository adı; HUGGINGFACE_REPO ortam değişkeni ya da --repo ile değiştirilebilir
+REPO_NAME = "sadece/sayha"
 
-        # Yeni veriyi dataset'e dönüştür
-        new_dataset = Dataset.from_dict(new_dataset_dict)
-        new_dataset = new_dataset.cast_column('audio', Audio())
-        new_dataset = new_dataset.cast_column('spectrogram', Image())
+# Parçaların repository'deki klasörü. float16 Array2D mfcc ve mel sütunlu
+# şema, data/ altındaki eski parçalardan farklı olduğundan ayrı bir klasöre
+# (load_dataset(..., data_dir="v2")) yüklenir
+UPLOAD_DATA_DIR = "v2"
 
-        # Geçici klasör oluştur
-        temp_dir = os.path.join("temp_dataset", "data")
-        os.makedirs(temp_dir, exist_ok=True)
+# Bir commit'te gönderilecek en fazla parça sayısı
+COMMIT_MAX_FILES = 50
 
+# Aynı anda sürebilecek commit sayısı
+MAX_INFLIGHT_COMMITS = 2
+
+# Ağ işlemleri için deneme sayısı ve ilk bekleme süresi (sn); her
+# denemede bekleme iki katına çıkar
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 2.0
+
+# Parçaların commit edilene kadar bekletildiği yerel klasör
+UPLOAD_WORK_DIR = "temp_dataset"
+
+@functools.lru_cache(maxsize=None)
+def get_api(token):
+    """Token başına tek bir HfApi nesnesi döndürür (HTTP oturumu yeniden kullanılır)."""
+    return HfApi(token=token)
+
+@functools.lru_cache(maxsize=None)
+def network_errors():
+    """Bağlantı ve zaman aşımı hata türleri (huggingface_hub'ın HTTP istemcisininkiler dahil)."""
+    errors = [ConnectionError, TimeoutError]
+    try:
+        import requests
+        errors += [requests.ConnectionError, requests.Timeout]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+def is_retryable(error):
+    """Yalnızca bağlantı/zaman aşımı hataları ve 408/429/5xx yanıtları tekrar denenir."""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    return isinstance(error, network_errors())
+
+def with_retries(fn, description, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY):
+    """fn()'i üstel bekleme (ve rastgele sapma) ile en fazla attempts kez dener."""
+    for attempt in range(1, attempts + 1):
         try:
-            # Repository'deki mevcut dosyaları listele
-            repo_files = api.list_repo_files(repo_id=repo_name, repo_type="dataset")
-            # Mevcut parquet dosyalarını say
-            parquet_files = [f for f in repo_files if f.startswith('data/train-') and f.endswith('.parquet')]
-            if parquet_files:
-                parquet_count = max([int(f.split('-')[1].split('-')[0]) for f in parquet_files]) + 1
-            else:
-                parquet_count = 0
+            return fn()
         except Exception as e:
-            print(f"Repository dosyaları listelenirken hata oluştu: {e}")
-            parquet_count = 0
+            if attempt == attempts or not is_retryable(e):
+                raise
+            delay = base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+            print(f"Uyarı: {description} başarısız ({e}); {delay:.1f} sn sonra tekrar denenecek ({attempt}/{attempts})")
+            time.sleep(delay)
+
+class UploadSession:
+    """Repository'yi bir kez okuyup parçaları toplu commit'lerle yükleyen oturum.
+
+    Gönderilmeyen parçalar kayıt defterinde kalır ve sonraki oturumda devralınır.
+    """
+
+    def __init__(self, repo_name=None, token=None, commit_files=COMMIT_MAX_FILES,
+                 max_bytes=SHARD_TARGET_BYTES, max_rows=None, max_inflight=MAX_INFLIGHT_COMMITS,
+                 work_dir=UPLOAD_WORK_DIR, data_dir=UPLOAD_DATA_DIR):
+        load_dotenv()
+        token = token or os.getenv('HUGGINGFACE_TOKEN')
+        repo_name = repo_name or os.getenv('HUGGINGFACE_REPO') or REPO_NAME
+        if not token:
+            raise ValueError("HUGGINGFACE_TOKEN bulunamadı. Lütfen .env dosyasını kontrol edin.")
+
+        self.repo_name = repo_name
+        self.commit_files = max(1, commit_files)
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.data_dir = data_dir.strip('/')
+        self.shard_dir = os.path.join(work_dir, "data")
+        self.work_dir = work_dir
+        self.api = get_api(token)
+        self.max_inflight = max(1, max_inflight)
+        self.commits = 0
+        # Commit sırası bekleyen parça yolları, repository'deki adları ve parçaları zaten yazılmış veri setleri
+        self._pending = []
+        self._names = {}
+        self._staged = set()
+        self._inflight = set()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_inflight)
+
+        print(f"Kullanılan repository: {repo_name} ({self.data_dir}/)")
+        self._ensure_repo()
+        repo_files = with_retries(
+            lambda: self.api.list_repo_files(repo_id=self.repo_name, repo_type="dataset"),
+            "Repository dosyalarını listeleme",
+        )
+        resumed = self._resume(set(repo_files))
+        self.next_number = max(
+            [shard_number(f) + 1 for f in repo_files if is_train_shard(f, self.data_dir)]
+            + [shard_number(path) + 1 for path in resumed],
+            default=0,
+        )
+        print(f"Yeni parquet dosyası numarası: {self.next_number}")
 
-        print(f"Yeni parquet dosyası numarası: {parquet_count}")
+    def _ensure_repo(self):
+        exists = with_retries(
+            lambda: self.api.repo_exists(repo_id=self.repo_name, repo_type="dataset"),
+            "Repository kontrolü",
+        )
+        if exists:
+            print(f"Repository bulundu: {self.repo_name}")
+            return
+        print(f"Repository oluşturuluyor: {self.repo_name}")
+        with_retries(
+            lambda: self.api.create_repo(repo_id=self.repo_name, repo_type="dataset", private=False, exist_ok=True),
+            "Repository oluşturma",
+        )
+        print(f"Yeni repository oluşturuldu: {self.repo_name}")
+
+    def _resume(self, repo_files):
+        """Önceki oturumlardan kalan parçaları devralır; yeniden gönderilecek yolları döndürür."""
+        ledger = get_ledger()
+        pending = ledger.pending_upload_shards()
+        if not pending:
+            return []
+
+        committed = [row['name'] for row in pending if row['name'] in repo_files]
+        for dataset_path in ledger.commit_upload_shards(committed):
+            print(f"Önceki oturumda yüklenmiş: {dataset_path}")
+
+        resumed = []
+        dropped = set()
+        for row in pending:
+            if row['name'] in repo_files:
+                if os.path.exists(row['local_path']):
+                    os.unlink(row['local_path'])
+            elif os.path.exists(row['local_path']):
+                resumed.append(row['local_path'])
+                self._names[row['local_path']] = row['name']
+                self._staged.update(path for path, _ in json.loads(row['datasets']))
+            elif row['batch'] not in dropped:
+                # Parça kaybolmuş; batch'in veri setleri yüklenmemiş kalır ve yeniden yazılır
+                print(f"Uyarı: Yarım kalan parça bulunamadı, batch bırakılıyor: {row['name']}")
+                ledger.drop_upload_batch(row['batch'])
+                dropped.add(row['batch'])
+        if resumed:
+            print(f"Önceki oturumdan {len(resumed)} parça yeniden gönderilecek.")
+            self._pending.extend(resumed)
+        return resumed
+
+    def add_datasets(self, dataset_paths):
+        """Veri seti dosyalarını parçalara yazar ve commit sırasına ekler.
+
+        Bekleyen parça sayısı commit_files'a ulaştıkça commit başlatılır.
+        Parçaları önceki bir oturumda yazılıp gönderilmeyi bekleyen dosyalar
+        atlanır. Yazılan parça yollarını döndürür.
+        """
+        for dataset_path in dataset_paths:
+            if dataset_path in self._staged:
+                print(f"Parçaları zaten yazılmış, gönderilmeyi bekliyor: {dataset_path}")
+        dataset_paths = [path for path in dataset_paths if path not in self._staged]
+        if not dataset_paths:
+            return []
+        shard_paths, written = write_upload_shards(
+            dataset_paths, self.shard_dir, self.next_number, self.max_bytes, self.max_rows
+        )
+        if not shard_paths:
+            print("Yüklenecek satır bulunamadı.")
+            return []
+
+        self.next_number += len(shard_paths)
+        self._staged.update(written)
+        self._names.update((path, f"{self.data_dir}/{os.path.basename(path)}") for path in shard_paths)
+        get_ledger().stage_upload_shards(
+            uuid.uuid4().hex,
+            [(self._names[path], path) for path in shard_paths],
+            [(path, get_video_id_from_filename(os.path.basename(path))) for path in written],
+        )
+        for shard_path in shard_paths:
+            print(f"Parça kaydedildi: {os.path.basename(shard_path)} ({os.path.getsize(shard_path) / 1024 ** 2:.1f} MB)")
+        self._pending.extend(shard_paths)
+
+        while len(self._pending) >= self.commit_files:
+            self._submit(self._take())
+        return shard_paths
+
+    def _take(self):
+        batch, self._pending = self._pending[:self.commit_files], self._pending[self.commit_files:]
+        return batch
 
-        # Dataset'i parquet formatında kaydet
-        parquet_filename = f"train-{parquet_count:05d}-of-{parquet_count+1:05d}.parquet"
-        new_dataset.to_parquet(os.path.join(temp_dir, parquet_filename))
+    def _submit(self, batch):
+        """batch'i arka planda commit eder; havuz doluysa bir commit'in bitmesini bekler."""
+        while len(self._inflight) >= self.max_inflight:
+            self._wait(FIRST_COMPLETED)
+        self._inflight.add(self._executor.submit(self._commit, batch))
 
-        print(f"Dataset parquet formatında kaydedildi: {parquet_filename}")
+    def _wait(self, return_when=ALL_COMPLETED):
+        done, self._inflight = wait(self._inflight, return_when=return_when)
+        for future in done:
+            future.result()
 
-        # Hugging Face'e yükle
-        api.upload_folder(
-            folder_path=os.path.join("temp_dataset", "data"),
-            repo_id=repo_name,
-            repo_type="dataset",
-            path_in_repo="data",
-            token=hf_token
+    def _commit(self, batch):
+        """batch'teki parçaları tek bir commit ile gönderir, ardından yerel kopyaları siler."""
+        names = [self._names[shard_path] for shard_path in batch]
+        operations = [
+            CommitOperationAdd(path_in_repo=name, path_or_fileobj=shard_path)
+            for name, shard_path in zip(names, batch)
+        ]
+        first, last = os.path.basename(batch[0]), os.path.basename(batch[-1])
+        message = f"{len(batch)} parça eklendi: {first}" + (f" .. {last}" if len(batch) > 1 else "")
+        with_retries(
+            lambda: self.api.create_commit(
+                repo_id=self.repo_name,
+                repo_type="dataset",
+                operations=operations,
+                commit_message=message,
+            ),
+            f"Commit ({first})",
         )
-        print(f"Veri seti başarıyla güncellendi: {repo_name}")
-        
-        # Geçici klasörü temizle
-        if os.path.exists("temp_dataset"):
-            shutil.rmtree("temp_dataset")
-        
-        # Yüklenen dosyayı kaydet
-        with open('uploaded_to_huggingface.txt', 'a', encoding='utf-8') as f:
-            f.write(f"{json_path}\n")
-            
+        self.commits += 1
+        print(f"Commit gönderildi: {message}")
+
+        get_ledger().commit_upload_shards(names)
+        for shard_path in batch:
+            os.unlink(shard_path)
+
+    def flush(self):
+        """Bekleyen tüm parçaları commit_files'lık commit'ler halinde gönderir ve bitmelerini bekler."""
+        while self._pending:
+            self._submit(self._take())
+        self._wait()
+
+    def close(self, send=True):
+        """send True ise bekleyen parçaları gönderir; her şey gönderildiyse yerel klasörü siler."""
+        try:
+            if send:
+                self.flush()
+            else:
+                # Süren commit'ler yine de tamamlansın; sonuçları kayıt defterine işlenir
+                wait(self._inflight)
+        finally:
+            self._executor.shutdown(wait=True)
+            if not self._pending and os.path.exists(self.work_dir) and not get_ledger().pending_upload_shards():
+                shutil.rmtree(self.work_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.close(send=exc_type is None)
+
+def is_train_shard(name, data_dir=UPLOAD_DATA_DIR):
+    return name.startswith(f'{data_dir}/train-') and name.endswith('.parquet')
+
+def shard_number(path):
+    """.../train-00003.parquet (ya da eski train-00003-of-00006.parquet) adından parça numarasını (3) döndürür."""
+    return int(os.path.basename(path).split('-')[1].split('.')[0])
+
+def estimate_upload_bytes(dataset_path):
+    """Veri seti dosyasının gömülü ses ve spektrogramlarla birlikte yaklaşık yükleme boyutu."""
+    size = os.path.getsize(dataset_path)
+    if not dataset_path.endswith('.parquet'):
+        return size
+
+    shard_indexes = {}
+    table = pq.read_table(dataset_path, columns=['audio_file', 'spectrogram'])
+    for path in table.column('audio_file').to_pylist() + table.column('spectrogram').to_pylist():
+        try:
+            if not path:
+                continue
+            if is_shard_ref(path):
+                directory, member = split_shard_ref(path)
+                size += shard_index(directory, shard_indexes).size(member)
+            else:
+                size += os.path.getsize(path)
+        except (OSError, KeyError):
+            continue
+    return size
+
+class BackgroundUploader:
+    """İşleme sürerken biten veri seti dosyalarını parça hedefi boyutunda gruplayıp arka planda yükler.
+
+    Yükleme hatası işlemeyi durdurmaz; gönderilemeyen dosyalar sonraki çalıştırmada yüklenir.
+    """
+
+    def __init__(self, **session_options):
+        self.session_options = session_options
+        self.error = None
+        self.submitted = []
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def submit(self, dataset_path):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="hf-uploader", daemon=True)
+            self._thread.start()
+        self.submitted.append(dataset_path)
+        self._queue.put(dataset_path)
+
+    def _run(self):
+        try:
+            with UploadSession(**self.session_options) as session:
+                batch, batch_bytes = [], 0
+                while True:
+                    dataset_path = self._queue.get()
+                    if dataset_path is not None:
+                        batch.append(dataset_path)
+                        batch_bytes += estimate_upload_bytes(dataset_path)
+                    if batch and (dataset_path is None or batch_bytes >= session.max_bytes):
+                        session.add_datasets(batch)
+                        batch, batch_bytes = [], 0
+                    if dataset_path is None:
+                        break
+            print(f"Arka plan yüklemesi tamamlandı: {session.repo_name} ({session.commits} commit)")
+        except Exception as e:
+            self.error = e
+            print(f"Hata: Arka plan yüklemesi durdu, kalan dosyalar sonraki çalıştırmada yüklenecek: {e}")
+
+    def close(self):
+        """Kuyruktaki dosyaları gönderir ve bitmesini bekler; yüklenemeyen dosyaların yollarını döndürür."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+        ledger = get_ledger()
+        return [path for path in self.submitted if not ledger.is_uploaded(path)]
+
+def upload_to_huggingface(dataset_paths, max_bytes=SHARD_TARGET_BYTES, max_rows=None, commit_files=COMMIT_MAX_FILES,
+                          repo_name=None, data_dir=UPLOAD_DATA_DIR):
+    """Veri seti dosyalarını hedef boyutlu parçalar halinde, olabildiğince az commit ile yükler."""
+    try:
+        with UploadSession(repo_name, commit_files=commit_files, max_bytes=max_bytes, max_rows=max_rows,
+                           data_dir=data_dir) as session:
+            session.add_datasets(dataset_paths)
+        print(f"Veri seti başarıyla güncellendi: {session.repo_name} ({session.commits} commit)")
     except Exception as e:
         print(f"Yükleme sırasında hata oluştu: {e}")
-        if os.path.exists("temp_dataset"):
-            shutil.rmtree("temp_dataset")
         raise
 
 def clean_output_directory():
     """Output klasörünü temizler, alt klasörlerdeki tüm dosyaları siler"""
     output_dir = "output"
-    subdirs = ['audio', 'json', 'spectrogram']
+    subdirs = ['audio', 'json', 'dataset', 'spectrogram']
     
     try:
         for subdir in subdirs:
@@ -151,51 +562,79 @@ def clean_output_directory():
         print(f"Output klasörü temizlenirken hata oluştu: {e}")
 
 def get_video_id_from_filename(filename):
-    """JSON dosya adından video_id'yi çıkarır"""
-    return filename.split('_processed_dataset.json')[0]
+    """Veri seti dosya adından video_id'yi çıkarır"""
+    return filename.split('_processed_dataset')[0]
 
-if __name__ == "__main__":
-    # JSON dosyalarını bul
-    json_folder = os.path.join("output", "json")
-    if not os.path.exists(json_folder):
-        raise ValueError("JSON klasörü bulunamadı!")
+def find_dataset_files(output_dir="output"):
+    """output/dataset altındaki Parquet ve output/json altındaki eski JSON veri setlerini bulur."""
+    dataset_files = []
+    for subdir, extension in (("dataset", ".parquet"), ("json", ".json")):
+        folder = os.path.join(output_dir, subdir)
+        if os.path.exists(folder):
+            dataset_files.extend(
+                os.path.join(folder, f) for f in sorted(os.listdir(folder))
+                if f.endswith(f"_processed_dataset{extension}")
+            )
+    return dataset_files
 
-    json_files = [f for f in os.listdir(json_folder) if f.endswith('_processed_dataset.json')]
-    
-    if not json_files:
-        raise ValueError("İşlenmiş veri seti JSON dosyası bulunamadı!")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="İşlenmiş veri setlerini Hugging Face'e parçalar halinde yükler.")
+    parser.add_argument(
+        "--repo",
+        help=f"Hedef dataset repository'si (varsayılan: HUGGINGFACE_REPO ya da {REPO_NAME})"
+    )
+    parser.add_argument(
+        "--data-dir", default=UPLOAD_DATA_DIR,
+        help=f"Parçaların repository'deki klasörü (varsayılan: {UPLOAD_DATA_DIR})"
+    )
+    parser.add_argument(
+        "--shard-size", type=float, default=SHARD_TARGET_BYTES / 1024 ** 2,
+        help="Bir Parquet parçasının hedef boyutu, MB (varsayılan: 500)"
+    )
+    parser.add_argument(
+        "--shard-rows", type=int,
+        help="Bir Parquet parçasındaki en fazla satır sayısı (varsayılan: sınırsız)"
+    )
+    parser.add_argument(
+        "--commit-files", type=int, default=COMMIT_MAX_FILES,
+        help=f"Tek bir commit'te gönderilecek en fazla parça sayısı (varsayılan: {COMMIT_MAX_FILES})"
+    )
+    return parser.parse_args(argv)
 
-    upload_success = True  # Yükleme başarısını takip etmek için değişken
+def main(argv=None):
+    args = parse_args(argv)
 
-    # Her JSON dosyası için
-    for json_file in json_files:
-        json_path = os.path.join(json_folder, json_file)
-        
-        # Daha önce yüklenip yüklenmediğini kontrol et
-        if os.path.exists('uploaded_to_huggingface.txt'):
-            with open('uploaded_to_huggingface.txt', 'r', encoding='utf-8') as f:
-                uploaded_files = f.read().splitlines()
-                if json_path in uploaded_files:
-                    print(f"Bu dosya zaten yüklenmiş, atlanıyor: {json_path}")
-                    continue
-
-        # Video ID'yi dosya adından al
-        video_id = get_video_id_from_filename(json_file)
-        load_dotenv()
-      
-         
-        
-        
+    # İşlenmiş veri seti dosyalarını bul
+    dataset_files = find_dataset_files("output")
+
+    if not dataset_files:
+        raise ValueError("İşlenmiş veri seti dosyası bulunamadı!")
+
+    # Daha önce yüklenenleri atla
+    pending = []
+    for dataset_path in dataset_files:
+        if get_ledger().is_uploaded(dataset_path):
+            print(f"Bu dosya zaten yüklenmiş, atlanıyor: {dataset_path}")
+            continue
+        pending.append(dataset_path)
+
+    upload_success = True  # Yükleme başarısını takip etmek için değişken
+    if pending:
         try:
-            upload_to_huggingface(json_path, video_id)
+            upload_to_huggingface(
+                pending, int(args.shard_size * 1024 ** 2), args.shard_rows, args.commit_files,
+                repo_name=args.repo, data_dir=args.data_dir,
+            )
         except Exception as e:
             print(f"Yükleme hatası: {e}")
             upload_success = False
-            break
 
     # Tüm yüklemeler başarılı olduysa output klasörünü temizle
     if upload_success:
         print("Tüm yüklemeler başarıyla tamamlandı. Output klasörü temizleniyor...")
         clean_output_directory()
     else:
-        print("Bazı yüklemeler başarısız oldu. Output klasörü temizlenmedi.")
\ No newline at end of file
+        print("Bazı yüklemeler başarısız oldu. Output klasörü temizlenmedi.")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
+import argparse
+import json
+import multiprocessing
 import os
 import re
+import shutil
 import sys
-from pydub import AudioSegment
-import webvtt
+import tempfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import yt_dlp
+from audio_segmenter import OUTPUT_FORMATS, encode_segment, iter_segments, probe_audio, speech_features, write_segment
+from pipeline_ledger import get_ledger
+from processed_dataset import SPECTROGRAM_MODES, TOKENIZER_NAME, Featurizer, SegmentSink
+from shard_store import SHARD_MAX_BYTES, ShardWriter, shard_ref
+from subtitle_cues import pack_cues, read_vtt, speech_mask, subtitle_gate
 
 def sanitize_filename(text):
     """Dosya isimlerindeki geçersiz karakterleri temizler."""
@@ -20,65 +30,115 @@ def extract_video_id(url):
     return video_id
 
 def check_if_video_downloaded(video_id):
-    """Video kimliğinin daha önce indirilip indirilmediğini kontrol eder."""
-    if not os.path.exists("downloaded_videos.txt"):
-        return False  # Dosya yoksa, video indirilmemiş demektir.
-    
-    with open("downloaded_videos.txt", "r") as file:
-        downloaded_videos = file.read().splitlines()
-        return video_id in downloaded_videos
+    """Video kimliğinin daha önce indirilip bölünüp bölünmediğini kontrol eder."""
+    return get_ledger().has_reached(video_id, "split")
 
 def mark_video_as_downloaded(video_id):
-    """Video kimliğini indirilenler listesine ekler."""
-    with open("downloaded_videos.txt", "a") as file:
-        file.write(video_id + "\n")
+    """Videonun indirilip bölündüğünü kayıt defterine işler."""
+    get_ledger().mark(video_id, "split")
+
+def get_downloaded_paths(info_dict):
+    """yt-dlp bilgi sözlüğünden indirilen ses ve Türkçe altyazı dosyalarının yollarını alır."""
+    audio_file = None
+    for download in info_dict.get('requested_downloads') or []:
+        audio_file = download.get('filepath') or audio_file
+
+    subtitle = (info_dict.get('requested_subtitles') or {}).get('tr') or {}
+    subtitle_file = subtitle.get('filepath')
+    if subtitle_file and not os.path.exists(subtitle_file):
+        subtitle_file = None
+
+    return audio_file, subtitle_file
+
+class SubtitleRejected(Exception):
+    """Altyazı bulunamadığında ya da ses indirme ölçütlerini karşılamadığında fırlatılır."""
+
+def download_subtitles_first(url, work_dir=".", gate=None):
+    """Önce yalnızca Türkçe altyazıyı indirir, ölçütleri geçerse sesi indirir.
+
+    gate, subtitle_gate eşiklerini (min_cues, min_speech_cues, min_coverage)
+    içeren bir sözlüktür. Elenen videolar için yalnızca birkaç KB'lık altyazı
+    indirilmiş olur; ses indirilmeden SubtitleRejected fırlatılır.
+    """
+    outtmpl = os.path.join(work_dir, 'video.%(ext)s')
+
+    # 1. aşama: yalnızca altyazı
+    subtitle_opts = {
+        'skip_download': True,
+        'writesubtitles': True,
+        'writeautomaticsub': True,
+        'subtitleslangs': ['tr'],
+        'subtitlesformat': 'vtt',
+        'outtmpl': outtmpl,
+    }
+    with yt_dlp.YoutubeDL(subtitle_opts) as ydl:
+        info_dict = ydl.extract_info(url, download=True)
+    video_title = info_dict.get('title', 'video')
+
+    _, subtitle_file = get_downloaded_paths(info_dict)
+    if not subtitle_file:
+        raise SubtitleRejected("Türkçe altyazı bulunamadı")
+
+    duration_ms = int(info_dict['duration'] * 1000) if info_dict.get('duration') else None
+    passed, stats = subtitle_gate(read_vtt(subtitle_file), duration_ms, **(gate or {}))
+    print(f"Altyazı ölçütleri: {stats}")
+    if not passed:
+        raise SubtitleRejected(f"Altyazı ölçütleri karşılanmadı: {stats}")
+
+    # 2. aşama: yalnızca ses. Bölücü her kabı ffmpeg ile doğrudan çözdüğü için
+    # mp3'e ara dönüştürme yapılmaz.
+    audio_opts = {
+        'format': 'bestaudio[language=tr]/bestaudio/best',
+        'outtmpl': outtmpl,
+    }
+    with yt_dlp.YoutubeDL(audio_opts) as ydl:
+        audio_info = ydl.extract_info(url, download=True)
+    audio_file, _ = get_downloaded_paths(audio_info)
+
+    if not audio_file:
+        print("Hata: Ses dosyası bulunamadı!")
+    else:
+        print(f"Ses dosyası bulundu: {audio_file}")
+        print(f"Altyazı dosyası bulundu: {subtitle_file}")
+
+    return audio_file, subtitle_file, video_title
 
-def download_video_and_subtitles(url):
-    """YouTube'dan video ve altyazı indirir."""
+def download_video_and_subtitles(url, work_dir="."):
+    """YouTube'dan video ve altyazı indirir.
+
+    Dosyalar work_dir altına yazılır ve yolları klasör taranmadan doğrudan
+    yt-dlp'nin bilgi sözlüğünden alınır; böylece aynı anda çalışan işler
+    birbirlerinin dosyalarını görmez.
+    """
+    outtmpl = os.path.join(work_dir, 'video.%(ext)s')
+    # Ses özgün kabıyla bırakılır; bölücü onu ffmpeg ile doğrudan çözer
     ydl_opts = {
         'format': 'bestaudio[language=tr]/bestaudio/best',
         'writesubtitles': True,
         'writeautomaticsub': True,
         'subtitleslangs': ['tr'],
         'subtitlesformat': 'vtt',
-        'outtmpl': 'video.%(ext)s',
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-        }],
+        'outtmpl': outtmpl,
     }
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info_dict = ydl.extract_info(url, download=True)
         video_title = info_dict.get('title', 'video')
 
-        audio_file = None
-        for file in os.listdir():
-            if file.endswith(".mp3") or file.endswith(".webm") or file.endswith(".m4a"):
-                audio_file = file
-                break
-
-        subtitle_file = None
-        for file in os.listdir():
-            if file.endswith(".vtt") and "tr" in file:
-                subtitle_file = file
-                break
+        audio_file, subtitle_file = get_downloaded_paths(info_dict)
 
         if not subtitle_file:
             print("Türkçe altyazı bulunamadı. Otomatik altyazı Türkçe'ye çevriliyor...")
+            # Ses zaten indirildi, bu geçişte yalnızca altyazı alınır
             ydl_opts_auto = {
-                'format': 'bestaudio/best',
+                'skip_download': True,
                 'writeautomaticsub': True,
                 'subtitleslangs': ['tr'],
                 'subtitlesformat': 'vtt',
-                'outtmpl': 'video.%(ext)s',
+                'outtmpl': outtmpl,
             }
             with yt_dlp.YoutubeDL(ydl_opts_auto) as ydl_auto:
-                ydl_auto.download([url])
-            
-            for file in os.listdir():
-                if file.endswith(".vtt") and "tr" in file:
-                    subtitle_file = file
-                    break
+                auto_info = ydl_auto.extract_info(url, download=True)
+            _, subtitle_file = get_downloaded_paths(auto_info)
 
         if not audio_file:
             print("Hata: Ses dosyası bulunamadı!")
@@ -95,8 +155,9 @@ def clean_filename(filename):
     # Yeni satır karakterlerini boşlukla değiştir
     filename = filename.replace('\n', ' ')
     
-    # Windows'da dosya adında kullanılamayan karakterleri temizle
-    invalid_chars = '<>:"/\\|?*'
+    # Windows'da dosya adında kullanılamayan karakterleri ve parça
+    # başvurularında ayraç olan "#" işaretini temizle
+    invalid_chars = '<>:"/\\|?*#'
     for char in invalid_chars:
         filename = filename.replace(char, '')
     
@@ -111,58 +172,240 @@ def clean_filename(filename):
     
     return filename
 
-def webvtt_to_milliseconds(time_str):
-    """WebVTT zaman formatını milisaniyeye çevirir"""
-    h, m, s = time_str.split(':')
-    s, ms = s.split('.')
-    total_ms = (int(h) * 3600 + int(m) * 60 + int(s)) * 1000 + int(ms)
-    return total_ms
+# Segmentlerin yazım biçimi; sample_rate/channels None ise kaynağınki kullanılır
+AudioOutput = namedtuple("AudioOutput", "format sample_rate channels", defaults=("mp3", None, None))
+
+# Birleşik kipte öznitelik çıkarıcı ve MFCC sütun tipi
+FeatureOutput = namedtuple("FeatureOutput", "featurizer mfcc_dtype", defaults=("float32",))
+
+# Segment deposu: "files" (tek tek dosyalar) ya da "shards" (tar parçaları)
+SegmentStorage = namedtuple("SegmentStorage", "kind max_bytes", defaults=("files", SHARD_MAX_BYTES))
+
+# Segment kodlaması için çalıştırma boyunca kullanılan süreç havuzu ve işçi sayısı
+EncoderPool = namedtuple("EncoderPool", "executor workers")
 
-def split_audio_by_subtitles(audio_file, subtitle_file, video_id):
-    """Ses dosyasını altyazılara göre böler."""
+def start_encoder_pool(workers):
+    """workers > 1 ise kodlama havuzunu kurar, değilse None döndürür.
+
+    İşçiler forkserver ile başlatılır; indirme ve yükleme iş parçacıkları
+    çalışırken fork edilmez.
+    """
+    if workers <= 1:
+        return None
+    context = multiprocessing.get_context("forkserver")
+    return EncoderPool(ProcessPoolExecutor(max_workers=workers, mp_context=context), workers)
+
+def _report_segment(future, i, output_path, store=None):
+    """Havuzda kodlanan bir segmentin sonucunu yazdırır; store verilirse kodlanan baytları ona iletir.
+
+    Segment kaydedildiyse True döndürür.
+    """
     try:
-        # Ses dosyasını yükle
-        audio = AudioSegment.from_file(audio_file)
-        
-        # Çıktı klasörünü oluştur
-        output_dir = os.path.join("output", "audio", video_id)
-        os.makedirs(output_dir, exist_ok=True)
+        result = future.result()
+        if store is not None:
+            store(i, result)
+        print(f"Kaydedildi: {output_path}")
+        return True
+    except Exception as e:
+        print(f"Uyarı: Segment {i} işlenirken hata oluştu: {e}")
+        return False
+
+def encode_segments(segments, sample_rate, output_paths, encoder=None, store=None):
+    """Segmentleri sırayla ya da encoder havuzunda kodlar; store verilirse baytları ona iletir.
 
-        # Altyazı dosyasını doğrudan oku
-        subtitles = webvtt.read(subtitle_file)
+    (kaydedilen, hatalı) segment sayılarını döndürür.
+    """
+    def job(i, samples):
+        if store is not None:
+            return encode_segment, (samples, sample_rate, os.path.splitext(output_paths[i])[1][1:])
+        return write_segment, (samples, sample_rate, output_paths[i])
 
-        # Her altyazı için ses dosyasını böl
-        for i, caption in enumerate(subtitles):
+    saved = failed = 0
+    if encoder is None:
+        for i, samples in segments:
             try:
-                start_time = webvtt_to_milliseconds(caption.start)
-                end_time = webvtt_to_milliseconds(caption.end)
-                
-                # Çok kısa segmentleri atla
-                if end_time - start_time < 500:  # 500ms'den kısa segmentleri atla
-                    continue
-                
-                # Ses segmentini kes
-                segment = audio[start_time:end_time]
-                
-                # Dosya adını oluştur
-                text = clean_filename(caption.text)
-                output_filename = f"{i:03d}_{text}.mp3"
-                output_path = os.path.join(output_dir, output_filename)
-                
+                output_path = output_paths[i]
+
                 # Ses segmentini kaydet
-                segment.export(output_path, format="mp3")
+                function, args = job(i, samples)
+                result = function(*args)
+                if store is not None:
+                    store(i, result)
                 print(f"Kaydedildi: {output_path}")
-                
+                saved += 1
+
             except Exception as e:
                 print(f"Uyarı: Segment {i} işlenirken hata oluştu: {e}")
+                failed += 1
                 continue
+        return saved, failed
+
+    # Bekleyen iş sayısı sınırlıdır; kesilmiş PCM bellekte birikmez
+    max_pending = encoder.workers * 4
+    pending = {}
+    for i, samples in segments:
+        function, args = job(i, samples)
+        future = encoder.executor.submit(function, *args)
+        pending[future] = i
+        if len(pending) >= max_pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                if _report_segment(future, i, output_paths[i], store):
+                    saved += 1
+                else:
+                    failed += 1
+
+    for future in list(pending):
+        i = pending.pop(future)
+        if _report_segment(future, i, output_paths[i], store):
+            saved += 1
+        else:
+            failed += 1
+    return saved, failed
+
+def filter_non_speech_segments(segments, sample_rate, dropped, max_flatness=0.5, min_band_ratio=0.3):
+    """Spektral özelliklerine göre konuşma olmayan segmentleri kodlamadan önce ayıklar.
+
+    Elenen segmentlerin indeksleri dropped listesine eklenir.
+    """
+    for i, samples in segments:
+        flatness, band_ratio = speech_features(samples, sample_rate)
+        if flatness > max_flatness or band_ratio < min_band_ratio:
+            dropped.append(i)
+            continue
+        yield i, samples
+
+def tap_segments(segments, sample_rate, output_paths, texts, sink):
+    """Segmentleri kodlamaya aktarırken PCM'i ve özgün altyazı metnini öznitelik alıcısına da verir."""
+    for i, samples in segments:
+        sink.add(output_paths[i], samples, sample_rate, texts[i])
+        yield i, samples
+
+def split_audio_by_subtitles(audio_file, subtitle_file, video_id, encoder=None,
+                             min_duration_ms=500, max_duration_ms=None, max_gap_ms=500,
+                             output=AudioOutput(), refine=None, drop_non_speech=True,
+                             spectral_filter=None, features=None, storage=SegmentStorage()):
+    """Ses dosyasını altyazılara göre tek geçişte böler; features verilirse öznitelikleri de çıkarır.
+
+    Tüm segmentlerin öznitelikleri çıkarıldıysa True döndürür.
+    """
+    try:
+        # Çıktı klasörünü oluştur
+        shards = storage.kind == "shards"
+        audio_format = output.format
+        output_dir = os.path.join("output", "shards" if shards else "audio", video_id)
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Altyazı dosyasını akış halinde oku, kayan/tekrarlanan cue'ları birleştir
+        cues = read_vtt(subtitle_file)
+        if cues.duplicates:
+            print(f"{cues.duplicates} tekrarlanan altyazı birleştirildi.")
+
+        # Yalnızca müzik işareti / ses açıklaması içeren cue'ları at
+        if drop_non_speech:
+            speech = speech_mask(cues)
+            dropped_text = len(cues) - int(speech.sum())
+            cues = cues.select(speech)
+            if dropped_text:
+                print(f"Elendi: {dropped_text} müzik/ses açıklaması altyazısı.")
+
+        # Bitişik cue'ları hedef süredeki ifadelere paketle
+        if max_duration_ms:
+            cue_count = len(cues)
+            cues = pack_cues(cues, max_duration_ms, max_gap_ms)
+            print(f"{cue_count} altyazı {len(cues)} parçaya paketlendi.")
+
+        # Çok kısa segmentleri atla
+        keep = cues.durations >= min_duration_ms
+
+        # Her altyazı için kesilecek aralığı ve dosya adını belirle
+        spans = []
+        output_paths = {}
+        texts = {}
+        times = {}
+        for i, (start_time, end_time, text) in enumerate(cues):
+            if not keep[i]:
+                continue
+
+            # Dosya adını oluştur; parça deposunda yalnızca cue numarası kullanılır
+            if shards:
+                output_paths[i] = shard_ref(output_dir, f"{i:03d}.{audio_format}")
+            else:
+                output_filename = f"{i:03d}_{clean_filename(text)}.{audio_format}"
+                output_paths[i] = os.path.join(output_dir, output_filename)
+            texts[i] = text
+            times[i] = (start_time, end_time)
+            spans.append((i, start_time, end_time))
+
+        # Kaynağı bir kez çöz (gerekirse hedef örnekleme hızı ve kanal sayısına
+        # dönüştürerek) ve segmentleri akış üzerinden kes
+        sample_rate, channels = output.sample_rate, output.channels
+        if not sample_rate or not channels:
+            source_rate, source_channels = probe_audio(audio_file)
+            sample_rate = sample_rate or source_rate
+            channels = channels or source_channels
+        segments = iter_segments(audio_file, spans, sample_rate, channels, refine=refine)
+
+        # Konuşma olmayan segmentleri kodlamadan önce ele
+        dropped_spectral = []
+        if spectral_filter is not None:
+            segments = filter_non_speech_segments(segments, sample_rate, dropped_spectral, **spectral_filter)
+
+        # Birleşik kip: segmentler kodlanırken öznitelikleri de çıkarılır
+        sink = None
+        if features is not None:
+            sink = SegmentSink(features.featurizer, video_id, features.mfcc_dtype)
+            segments = tap_segments(segments, sample_rate, output_paths, texts, sink)
+
+        # Parça deposu: kodlanan baytlar metadatayla birlikte tar parçasına eklenir
+        writer = None
+        if shards:
+            writer = ShardWriter(output_dir, video_id, storage.max_bytes)
+
+            def store(i, data):
+                metadata = {
+                    "id": f"{video_id}_{i:03d}",
+                    "video_id": video_id,
+                    "text": texts[i],
+                    "start_ms": times[i][0],
+                    "end_ms": times[i][1],
+                }
+                writer.add(f"{i:03d}", {
+                    audio_format: data,
+                    "json": json.dumps(metadata, ensure_ascii=False).encode("utf-8"),
+                })
+        else:
+            store = None
+
+        try:
+            saved, failed = encode_segments(segments, sample_rate, output_paths, encoder, store)
+        finally:
+            if writer is not None:
+                writer.close()
+            if sink is not None:
+                sink.close()
+        if writer is not None:
+            print(f"{writer.samples} segment '{output_dir}' parçalarına yazıldı.")
+        if sink is not None:
+            print(f"Öznitelikler '{sink.path}' dosyasına kaydedildi ({sink.writer.rows} kayıt).")
+            if sink.failed:
+                print(
+                    f"Uyarı: {len(sink.failed)} segmentin öznitelikleri eksik; "
+                    "processed_dataset.py ile yeniden üretilebilir."
+                )
+        if dropped_spectral:
+            print(f"Elendi: {len(dropped_spectral)} segment spektral olarak konuşma dışı.")
+        if failed and not saved:
+            raise RuntimeError(f"Hiçbir segment kaydedilemedi ({failed} hata)")
+        return sink is not None and not sink.failed
 
     except Exception as e:
         print(f"Hata: Ses bölme işlemi sırasında bir sorun oluştu: {e}")
         raise
 
-def delete_temp_files(audio_file, subtitle_file):
-    """Geçici dosyaları (video ve altyazı) siler."""
+def delete_temp_files(audio_file, subtitle_file, work_dir=None):
+    """Geçici dosyaları (video ve altyazı) ve varsa işin çalışma klasörünü siler."""
     if audio_file and os.path.exists(audio_file):
         os.remove(audio_file)
         print(f"Geçici ses dosyası silindi: {audio_file}")
@@ -171,37 +414,313 @@ def delete_temp_files(audio_file, subtitle_file):
         os.remove(subtitle_file)
         print(f"Geçici altyazı dosyası silindi: {subtitle_file}")
 
-def main():
-    if len(sys.argv) != 2:
-        print("Kullanım: python youtube_splitter_tr.py <youtube_link>")
-        return
+    if work_dir and os.path.isdir(work_dir):
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def read_url_file(path):
+    """Bağlantı dosyasını okur.
+
+    Satır başına bir bağlantı (links.txt) ya da virgülle ayrılmış tırnaklı
+    bağlantılar (get_tr_altyazi_yil.py çıktısı) kabul edilir.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    urls = [part.strip().strip('"\'') for part in re.split(r'[\s,]+', content)]
+    return [url for url in urls if url.startswith("http")]
 
-    youtube_url = sys.argv[1]
-    print(f"İndiriliyor: {youtube_url}")
+def download_job(youtube_url, gate=None):
+    """Videoyu yalnızca bu işe ait geçici bir klasöre indirir.
 
-    video_id = extract_video_id(youtube_url)
-    if not video_id:
-        print("Hata: YouTube video kimliği bulunamadı!")
-        return
+    gate verilirse önce altyazı indirilip değerlendirilir (download_subtitles_first).
+    """
+    work_dir = tempfile.mkdtemp(prefix="sayha_")
+    try:
+        if gate is not None:
+            audio_file, subtitle_file, video_title = download_subtitles_first(youtube_url, work_dir, gate)
+        else:
+            audio_file, subtitle_file, video_title = download_video_and_subtitles(youtube_url, work_dir)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return audio_file, subtitle_file, video_title, work_dir
+
+def process_batch(youtube_urls, downloads=2, gate=None, uploader=None, **split_options):
+    """Videoları eşzamanlı indirip sırayla böler; başarısız video kimliklerini döndürür.
+
+    Altyazı ölçütleriyle elenenler başarısız sayılmaz.
+    """
+    jobs = {}
+    for youtube_url in youtube_urls:
+        video_id = extract_video_id(youtube_url)
+        if not video_id:
+            print(f"Hata: YouTube video kimliği bulunamadı! ({youtube_url})")
+            continue
+        if video_id in jobs or check_if_video_downloaded(video_id):
+            print(f"Uyarı: Bu video daha önce indirilmiş, atlanıyor! (Video ID: {video_id})")
+            continue
+        jobs[video_id] = youtube_url
+        get_ledger().add(video_id, youtube_url)
+
+    queue = list(jobs.items())
+    failed = []
+    rejected = []
+    skipped = []
+    print(f"Toplam {len(queue)} video işlenecek ({downloads} eşzamanlı indirme).")
+
+    with ThreadPoolExecutor(max_workers=downloads) as executor:
+        running = {}
+
+        def submit_next():
+            while queue:
+                video_id, youtube_url = queue.pop(0)
+                # Aynı listeyi işleyen başka bir süreç videoyu aldıysa sıradakine geç
+                if not get_ledger().claim("split", video_id=video_id):
+                    print(f"Uyarı: Bu video başka bir süreçte işleniyor, atlanıyor! (Video ID: {video_id})")
+                    skipped.append(video_id)
+                    continue
+                print(f"İndiriliyor: {youtube_url}")
+                running[executor.submit(download_job, youtube_url, gate)] = video_id
+                return
+
+        for _ in range(downloads):
+            submit_next()
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                video_id = running.pop(future)
+                # Bu video bölünürken ağ boş kalmasın
+                submit_next()
 
-    # Video daha önce indirilmiş mi kontrol et
-    if check_if_video_downloaded(video_id):
-        print(f"Uyarı: Bu video daha önce indirilmiş! (Video ID: {video_id})")
-        sys.exit(1)  # Programı burada durdur
+                try:
+                    audio_file, subtitle_file, video_title, work_dir = future.result()
+                except SubtitleRejected as e:
+                    print(f"Elendi: {video_id}: {e}")
+                    get_ledger().release(video_id, error=str(e))
+                    rejected.append(video_id)
+                    continue
+                except Exception as e:
+                    print(f"Hata: {video_id} indirilemedi: {e}")
+                    get_ledger().release(video_id, error=str(e))
+                    failed.append(video_id)
+                    continue
+
+                try:
+                    if not audio_file or not subtitle_file:
+                        get_ledger().release(video_id, error="ses ya da altyazı dosyası yok")
+                        failed.append(video_id)
+                        continue
+                    get_ledger().mark(video_id, "downloaded", release=False)
+                    featurized = split_audio_by_subtitles(audio_file, subtitle_file, video_id, **split_options)
+                    mark_video_as_downloaded(video_id)
+                    features = split_options.get("features")
+                    if featurized:
+                        get_ledger().mark(video_id, "featurized")
+                        if uploader is not None:
+                            uploader.submit(features.featurizer.parquet_path(video_id))
+                    print(f"Tamamlandı: {video_title} ({video_id})")
+                except Exception as e:
+                    print(f"Hata: {video_id} bölünemedi: {e}")
+                    get_ledger().release(video_id, error=str(e))
+                    failed.append(video_id)
+                finally:
+                    delete_temp_files(audio_file, subtitle_file, work_dir)
 
-    # Video ve altyazıyı indir
-    audio_file, subtitle_file, video_title = download_video_and_subtitles(youtube_url)
+    print(
+        f"Toplu işlem bitti: {len(jobs) - len(failed) - len(rejected) - len(skipped)} başarılı, "
+        f"{len(rejected)} elendi, {len(failed)} başarısız, {len(skipped)} başka süreçte."
+    )
+    return failed
 
-    # Ses dosyasını altyazı aralıklarına göre böl
-    split_audio_by_subtitles(audio_file, subtitle_file, video_id)
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="YouTube videosunu Türkçe altyazılarına göre ses parçalarına böler."
+    )
+    parser.add_argument("youtube_urls", nargs="*", help="İşlenecek YouTube video bağlantıları")
+    parser.add_argument(
+        "--urls-file",
+        help="Bağlantıları içeren dosya (ör. links.txt)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Segment kodlaması için kullanılacak süreç sayısı (varsayılan: 1)"
+    )
+    parser.add_argument(
+        "--downloads", type=int, default=2,
+        help="Toplu modda eşzamanlı indirme sayısı (varsayılan: 2)"
+    )
+    parser.add_argument(
+        "--format", dest="audio_format", choices=sorted(OUTPUT_FORMATS), default="mp3",
+        help="Segment dosya biçimi (varsayılan: mp3)"
+    )
+    parser.add_argument(
+        "--sample-rate", type=int,
+        help="Kaynak kesimden önce bu örnekleme hızına dönüştürülür, ör. 16000 (varsayılan: kaynağınki)"
+    )
+    parser.add_argument(
+        "--channels", type=int,
+        help="Kanal sayısı, ör. 1 = mono (varsayılan: kaynağınki)"
+    )
+    parser.add_argument(
+        "--refine-boundaries", action="store_true",
+        help="Sınırları enerji zarfına göre sessiz noktalara oturt ve baştaki/sondaki sessizliği kırp"
+    )
+    parser.add_argument(
+        "--snap-window", type=float, default=0.15,
+        help="--refine-boundaries ile sınır başına arama penceresi, saniye (varsayılan: 0.15)"
+    )
+    parser.add_argument(
+        "--silence-threshold", type=float, default=-40.0,
+        help="--refine-boundaries ile sessizlik eşiği, dBFS (varsayılan: -40)"
+    )
+    parser.add_argument(
+        "--keep-non-speech", action="store_true",
+        help="Yalnızca müzik işareti (♫) ya da ses açıklaması ([Müzik]) içeren altyazıları da dışa aktar"
+    )
+    parser.add_argument(
+        "--spectral-filter", action="store_true",
+        help="Spektral düzlük ve konuşma bandı oranına göre konuşma olmayan segmentleri kodlamadan ele"
+    )
+    parser.add_argument(
+        "--max-flatness", type=float, default=0.5,
+        help="--spectral-filter ile izin verilen en yüksek spektral düzlük (varsayılan: 0.5)"
+    )
+    parser.add_argument(
+        "--min-band-ratio", type=float, default=0.3,
+        help="--spectral-filter ile 300-3400 Hz bandındaki enerji oranı alt sınırı (varsayılan: 0.3)"
+    )
+    parser.add_argument(
+        "--subtitle-first", action="store_true",
+        help="Önce yalnızca altyazıyı indir; ses yalnızca ölçütleri geçen videolar için indirilir"
+    )
+    parser.add_argument(
+        "--min-cues", type=int, default=10,
+        help="--subtitle-first ile gereken en az altyazı sayısı (varsayılan: 10)"
+    )
+    parser.add_argument(
+        "--min-speech-cues", type=int, default=5,
+        help="--subtitle-first ile gereken en az konuşma (müzik olmayan) altyazı sayısı (varsayılan: 5)"
+    )
+    parser.add_argument(
+        "--min-coverage", type=float, default=0.2,
+        help="--subtitle-first ile konuşma altyazılarının videoyu kaplama oranı alt sınırı (varsayılan: 0.2)"
+    )
+    parser.add_argument(
+        "--pack", action="store_true",
+        help="Bitişik altyazıları --max-duration süresine kadar tek parçada birleştir"
+    )
+    parser.add_argument(
+        "--min-duration", type=float, default=0.5,
+        help="Bundan kısa parçalar atlanır, saniye (varsayılan: 0.5)"
+    )
+    parser.add_argument(
+        "--max-duration", type=float, default=15.0,
+        help="--pack ile bir parçanın en uzun süresi; daha uzun altyazılar bölünür, saniye (varsayılan: 15)"
+    )
+    parser.add_argument(
+        "--max-gap", type=float, default=0.5,
+        help="--pack ile birleştirilecek altyazılar arasındaki en büyük boşluk, saniye (varsayılan: 0.5)"
+    )
+    parser.add_argument(
+        "--storage", choices=("files", "shards"), default="files",
+        help="Segment deposu: her segment ayrı dosya ya da output/shards altında boyut sınırlı tar parçaları (varsayılan: files)"
+    )
+    parser.add_argument(
+        "--shard-size", type=float, default=SHARD_MAX_BYTES / 1024 ** 2,
+        help="--storage shards ile bir tar parçasının MB cinsinden üst sınırı (varsayılan: 256)"
+    )
+    parser.add_argument(
+        "--featurize", action="store_true",
+        help="Birleşik kip: segmentlerin özniteliklerini bölme sırasında bellekten çıkar (processed_dataset.py gerekmez)"
+    )
+    parser.add_argument(
+        "--spectrogram", dest="spectrogram_mode", choices=SPECTROGRAM_MODES, default="png",
+        help="--featurize ile spektrogram çıktı kipi (varsayılan: png)"
+    )
+    parser.add_argument(
+        "--tokenizer", dest="tokenizer_name", default=TOKENIZER_NAME,
+        help=f"--featurize ile kullanılacak tokenizer (varsayılan: {TOKENIZER_NAME})"
+    )
+    parser.add_argument(
+        "--mfcc-dtype", choices=("float32", "float16"), default="float32",
+        help="--featurize ile MFCC sütununun tipi (varsayılan: float32)"
+    )
+    parser.add_argument(
+        "--upload", action="store_true",
+        help="--featurize ile biten videoların veri setlerini sonraki videolar işlenirken arka planda yükle"
+    )
+    args = parser.parse_args()
+    if not args.youtube_urls and not args.urls_file:
+        parser.error("En az bir YouTube bağlantısı ya da --urls-file gerekli")
+    if args.upload and not args.featurize:
+        parser.error("--upload yalnızca --featurize ile kullanılabilir")
+    return args
 
-    # Geçici dosyaları sil
-    delete_temp_files(audio_file, subtitle_file)
+def split_options_from_args(args):
+    """Komut satırı seçeneklerini split_audio_by_subtitles parametrelerine çevirir."""
+    return {
+        "min_duration_ms": int(args.min_duration * 1000),
+        "max_duration_ms": int(args.max_duration * 1000) if args.pack else None,
+        "max_gap_ms": int(args.max_gap * 1000),
+        "output": AudioOutput(args.audio_format, args.sample_rate, args.channels),
+        "refine": {
+            "search_ms": int(args.snap_window * 1000),
+            "margin_ms": 50,
+            "threshold_db": args.silence_threshold,
+        } if args.refine_boundaries else None,
+        "drop_non_speech": not args.keep_non_speech,
+        "spectral_filter": {
+            "max_flatness": args.max_flatness,
+            "min_band_ratio": args.min_band_ratio,
+        } if args.spectral_filter else None,
+        # Featurizer bir kez kurulur; tokenizer tüm videolar için yeniden kullanılır
+        "features": FeatureOutput(
+            Featurizer(tokenizer_name=args.tokenizer_name, spectrogram_mode=args.spectrogram_mode),
+            args.mfcc_dtype,
+        ) if args.featurize else None,
+        "storage": SegmentStorage(args.storage, int(args.shard_size * 1024 ** 2)),
+    }
 
-    # Video kimliğini indirilenler listesine ekle
-    mark_video_as_downloaded(video_id)
+def gate_from_args(args):
+    """--subtitle-first verildiyse altyazı ölçütlerini, yoksa None döndürür."""
+    if not args.subtitle_first:
+        return None
+    return {
+        "min_cues": args.min_cues,
+        "min_speech_cues": args.min_speech_cues,
+        "min_coverage": args.min_coverage,
+    }
 
-    print("İşlem tamamlandı!")
+def main():
+    args = parse_args()
+    split_options = split_options_from_args(args)
+    gate = gate_from_args(args)
+
+    youtube_urls = list(args.youtube_urls)
+    if args.urls_file:
+        youtube_urls.extend(read_url_file(args.urls_file))
+
+    uploader = None
+    if args.upload:
+        from upload_to_huggingface import BackgroundUploader
+        uploader = BackgroundUploader()
+
+    # Kodlama havuzu tüm videolar için bir kez kurulur
+    encoder = start_encoder_pool(args.workers)
+
+    # Tek bağlantı da toplu işlemle aynı yoldan geçer
+    failed_uploads = []
+    try:
+        failed = process_batch(youtube_urls, args.downloads, gate, uploader, encoder=encoder, **split_options)
+    finally:
+        if encoder is not None:
+            encoder.executor.shutdown()
+        if uploader is not None:
+            failed_uploads = uploader.close()
+    if failed_uploads:
+        print(f"Hata: {len(failed_uploads)} veri seti yüklenemedi, sonraki çalıştırmada yüklenecek: {', '.join(failed_uploads)}")
+    if failed or failed_uploads:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file